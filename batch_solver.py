@@ -0,0 +1,105 @@
+import time
+from typing import Dict, List, Optional, Tuple
+from constraints import Constraint
+from constraint_solver import ConstraintSolver
+import tensor_propagation
+from tensor_propagation import TensorPropagator
+
+
+class BatchSolver:
+    """
+    Solve many puzzles at once. Puzzles of the same shape (houses x attributes) are stacked
+    into one TensorPropagator, so a single propagation pass runs for the whole group.
+    Puzzles that propagation alone decides are read off the tensor. Only the undecided
+    ones go to a ConstraintSolver, which starts from the propagated domains.
+
+    Without NumPy there is no batched pass: every puzzle gets its own ConstraintSolver.
+
+    Extra keyword arguments (e.g. time_limit, node_limit) go to every ConstraintSolver.
+    After solve_all(), self.solvers[i] is the ConstraintSolver used for puzzle i (None when
+    propagation alone decided it), and self.statuses[i] is its status.
+    """
+
+    def __init__(self, puzzles: List[Tuple[Dict[str, List[str]], List[Constraint]]], **options):
+        self.puzzles = puzzles
+        self.options = options
+        self.solvers = [None] * len(puzzles)
+        self.statuses = [None] * len(puzzles)
+
+        self.group_count = 0
+        self.propagated_solved = 0  # Puzzles solved by the batched propagation alone
+        self.propagated_unsat = 0  # Puzzles the batched propagation proved unsolvable
+        self.searched = 0  # Puzzles handed on to per-puzzle backtracking
+        self.start_time = time.time()
+
+    def _groups(self) -> Dict[Tuple[int, int], List[int]]:
+        """Puzzle indices by shape (number of houses, number of attributes)."""
+        groups = {}
+        for i, (attributes, _) in enumerate(self.puzzles):
+            shape = (len(next(iter(attributes.values()))), len(attributes))
+            groups.setdefault(shape, []).append(i)
+        return groups
+
+    def _decode(self, attributes: Dict[str, List[str]], masks: List[List[int]]) -> Optional[Dict[int, Dict[str, str]]]:
+        """The grid if every cell is down to one value, else None."""
+        grid = {}
+        for h, row in enumerate(masks):
+            for (attr_key, values), mask in zip(attributes.items(), row):
+                if not mask or mask & (mask - 1):
+                    return None
+                grid.setdefault(h + 1, {})[attr_key] = list(dict.fromkeys(values))[mask.bit_length() - 1]
+        return grid
+
+    def solve_all(self) -> List[Optional[Dict[int, Dict[str, str]]]]:
+        """One solution (or None) per puzzle, in input order."""
+        self.start_time = time.time()
+        results = [None] * len(self.puzzles)
+        if tensor_propagation.np is None:
+            for i, (attributes, constraints) in enumerate(self.puzzles):
+                self.searched += 1
+                solver = ConstraintSolver(attributes, constraints, **self.options)
+                results[i] = solver.solve()
+                self.solvers[i] = solver
+                self.statuses[i] = solver.status
+            return results
+
+        for indices in self._groups().values():
+            self.group_count += 1
+            propagator = TensorPropagator([self.puzzles[i] for i in indices])
+            domains = propagator.initial.copy()
+            consistent = propagator.propagate(domains)
+            masks = propagator.to_masks(domains)
+
+            for p, i in enumerate(indices):
+                attributes, constraints = self.puzzles[i]
+                if not consistent[p]:
+                    self.propagated_unsat += 1
+                    self.statuses[i] = 'unsat'
+                    continue
+                grid = self._decode(attributes, masks[p])
+                # Clues the tensor does not model (wider scopes) still get their say
+                if grid is not None and all(constraint.is_valid(grid) for constraint in constraints):
+                    self.propagated_solved += 1
+                    self.statuses[i] = 'solved'
+                    results[i] = grid
+                    continue
+
+                self.searched += 1
+                solver = ConstraintSolver(attributes, constraints, **self.options)
+                solver.restrict_domains(masks[p])
+                results[i] = solver.solve()
+                self.solvers[i] = solver
+                self.statuses[i] = solver.status
+        return results
+
+    def get_stats(self) -> Dict[str, object]:
+        """How the batch was split between batched propagation and per-puzzle search."""
+        return {
+            'puzzles': len(self.puzzles),
+            'groups': self.group_count,
+            'propagated_solved': self.propagated_solved,
+            'propagated_unsat': self.propagated_unsat,
+            'searched': self.searched,
+            'backtrack_count': sum(solver.backtrack_count for solver in self.solvers if solver is not None),
+            'elapsed': time.time() - self.start_time,
+        }
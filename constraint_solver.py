@@ -1,25 +1,274 @@
-from typing import Dict, List, Tuple, Optional
-from constraints import Constraint
-import copy
+from typing import Dict, Iterator, List, Tuple, Optional
+from collections import deque
+from constraints import Constraint, SymmetryOrderConstrain, ValueIndex
+from tensor_propagation import TensorPropagator
 import csv
+import itertools
+import random
 import time
 
 
 
+# Effort counters reported by get_stats and summed over the sub-solvers of a decomposed puzzle
+EFFORT_COUNTERS = (
+    'backtrack_count', 'propagation_calls', 'assignment_attempts', 'domain_reductions',
+    'failed_attempts', 'search_effort', 'backjump_count', 'nogood_failures', 'restart_count',
+    'probe_count', 'probe_removals', 'solution_count', 'discrepancy_cutoffs', 'search_passes',
+)
+
+
+def _popcount(mask: int) -> int:
+    """Number of set bits in a domain bitmask."""
+    return bin(mask).count("1")
+
+
+def luby(i: int) -> int:
+    """The i-th term (1-based) of the Luby restart sequence 1, 1, 2, 1, 1, 2, 4, 1, ..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+def _iter_bits(mask: int):
+    """Yield the indices of the set bits in a domain bitmask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Assignment(dict):
+    """
+    Partial solution {houseNr: {attr_key: value}} used as the search state.
+
+    Keeps an inverse (attr_key, value) -> houseNr index in sync on assign/unassign,
+    so constraints can look up a value's position in O(1).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.position_index = {}
+
+    def assign(self, houseNr: int, attr_key: str, value: str) -> bool:
+        """Place value in houseNr; refuses (returns False) if it already sits in another house
+        or houseNr already holds a value for attr_key."""
+        if (attr_key, value) in self.position_index or attr_key in self.get(houseNr, {}):
+            return False
+        if houseNr not in self:
+            self[houseNr] = {}
+        self[houseNr][attr_key] = value
+        self.position_index[(attr_key, value)] = houseNr
+        return True
+
+    def unassign(self, houseNr: int, attr_key: str) -> None:
+        value = self[houseNr].pop(attr_key)
+        del self.position_index[(attr_key, value)]
+        if not self[houseNr]:
+            del self[houseNr]
+
+
 class ConstraintSolver:
     """
     Backtracking CSP solver with arc consistency (AC-3), forward checking, and MRV heuristic.
+
+    Attribute keys and values are interned once per puzzle, so every domain is an
+    integer bitmask over value indices (bit i set = value i still possible).
+    The dual model keeps, for every (attribute, value), the bitmask of houses it can
+    still occupy; both views are channelled through _set_domain.
+
+    branching: 'variable' picks a (house, attribute) and tries its values,
+               'value' picks an (attribute, value) and tries its houses.
+    backjumping: record which decisions caused every pruning, and on a dead end jump back
+                 to the latest decision involved instead of retrying the siblings in between.
+    nogood_limit: keep up to this many learned nogoods (sets of decisions that cannot all
+                  hold) and fail any branch that matches one; 0 disables the store.
+    heuristic: 'mrv' (fewest remaining values, ties by clue count) or 'domwdeg' (remaining
+               values divided by the weight of the propagators that read one of them; a
+               propagator's weight grows every time it fails).
+    seed: with 'domwdeg', break ties between equally good choices randomly from this seed.
+    restarts: None, 'luby' or 'geometric'; restart the search from the root after a growing
+              number of failed attempts (restart_base times the schedule term). Learned
+              weights and nogoods are kept across restarts. Needs heuristic='domwdeg':
+              'mrv' would only search the same tree again.
+    value_ordering: 'lookahead' tries each alternative, propagates, and orders them by how
+                    little they prune (least constraining first, failures last);
+                    'static' keeps the fixed order.
+    probing: None, 'root' or 'node'; singleton arc consistency by failed-literal probing,
+             once after the root propagation or at every search node. Each remaining value
+             is tried and propagated, and removed if that fails.
+    probe_limit / probe_time: work budget per probing pass, in probes and in seconds.
+    time_limit / node_limit: budget for one solve, in seconds and in search nodes. When it
+                             runs out the search stops; self.status tells why it ended
+                             ('solved', 'unsat', 'timeout', 'node_limit') and
+                             self.best_partial holds the most complete partial grid seen
+                             (cells assigned or narrowed to a single value).
+    decompose: split the attributes into groups no clue connects and solve each group with
+               its own sub-solver; all-different only couples values of one attribute, so
+               the groups are independent and their solutions are merged house by house.
+    symmetry_breaking: values no clue mentions (e.g. padding placeholders) are
+                       interchangeable within their attribute; fix their left-to-right
+                       order so solve() searches only one of their permutations.
+                       iter_solutions and count_solutions never use it: they enumerate
+                       every solution, swapped values included.
+    search: how the tree is explored; every strategy is a _search_<name> generator over
+            _backtrack, so all of them share its step accounting.
+            'dfs' is plain depth-first search.
+            'lds' is limited discrepancy search: only paths that leave the heuristic's first
+            choice at most max_discrepancies times (default 1) are searched; if that cut
+            anything and found nothing, the status is 'discrepancy_limit'.
+            'ilds' repeats LDS with 0, 1, 2, ... discrepancies until a pass searches the whole
+            tree (or max_discrepancies is reached), so solutions the heuristic almost
+            agrees with are found first.
+    propagation: 'queue' runs the event-driven propagators; 'tensor' computes the fixpoint
+                 with TensorPropagator's vectorized sweeps over a boolean house x attribute
+                 x value array instead (needs NumPy). Its prunings are not tied to a
+                 propagator, so 'tensor' turns off backjumping and the nogood store
+                 whatever backjumping and nogood_limit say.
     """
     
-    def __init__(self, attributes: Dict[str, List[str]], constraints: List[Constraint]):
+    def __init__(self, attributes: Dict[str, List[str]], constraints: List[Constraint],
+                 branching: str = 'variable', backjumping: bool = True, nogood_limit: int = 0,
+                 heuristic: str = 'mrv', seed: Optional[int] = None,
+                 restarts: Optional[str] = None, restart_base: int = 32,
+                 value_ordering: str = 'lookahead', probing: Optional[str] = None,
+                 probe_limit: int = 1000, probe_time: Optional[float] = None,
+                 time_limit: Optional[float] = None, node_limit: Optional[int] = None,
+                 decompose: bool = True, symmetry_breaking: bool = True,
+                 search: str = 'dfs', max_discrepancies: Optional[int] = None,
+                 propagation: str = 'queue'):
 
+        # Settings handed on to the sub-solvers of a decomposed puzzle
+        self.options = dict(
+            branching=branching, backjumping=backjumping, nogood_limit=nogood_limit,
+            heuristic=heuristic, seed=seed, restarts=restarts, restart_base=restart_base,
+            value_ordering=value_ordering, probing=probing, probe_limit=probe_limit,
+            probe_time=probe_time, decompose=False, symmetry_breaking=symmetry_breaking,
+            search=search, max_discrepancies=max_discrepancies, propagation=propagation,
+        )
+        
         self.attributes = attributes
         self.constraints = constraints
         self.num_House = len(next(iter(attributes.values())))
+        self.full_house_mask = (1 << self.num_House) - 1
+        
+        # Interning: attr_key -> index, and per attribute value -> bit index
+        self.index = ValueIndex(attributes)
+        self.attr_keys = self.index.attr_keys
+        self.attr_index = self.index.attr_index
+        self.attr_values = self.index.attr_values
+        self.value_index = self.index.value_index
+        self.full_masks = [(1 << len(values)) - 1 for values in self.attr_values]
+        self.sorted_attrs = sorted(range(len(self.attr_keys)), key=lambda a: self.attr_keys[a])
         
+        if branching not in ('variable', 'value'):
+            raise ValueError(f"Unknown branching strategy: {branching}")
+        self.branching = branching
+        self.backjumping = backjumping
+        self.nogood_limit = nogood_limit if backjumping else 0
+        
+        if heuristic not in ('mrv', 'domwdeg'):
+            raise ValueError(f"Unknown heuristic: {heuristic}")
+        if restarts not in (None, 'luby', 'geometric'):
+            raise ValueError(f"Unknown restart schedule: {restarts}")
+        if restarts is not None and heuristic != 'domwdeg':
+            raise ValueError("Restarts need heuristic='domwdeg'")
+        if value_ordering not in ('lookahead', 'static'):
+            raise ValueError(f"Unknown value ordering: {value_ordering}")
+        if probing not in (None, 'root', 'node'):
+            raise ValueError(f"Unknown probing mode: {probing}")
+        if search not in ('dfs', 'lds', 'ilds'):
+            raise ValueError(f"Unknown search strategy: {search}")
+        if propagation not in ('queue', 'tensor'):
+            raise ValueError(f"Unknown propagation mode: {propagation}")
+        if propagation == 'tensor':
+            # No propagator explains a tensor pruning, so there are no conflict sets to use
+            self.backjumping = False
+            self.nogood_limit = 0
+        self.heuristic = heuristic
+        self.value_ordering = value_ordering
+        self.probing = probing
+        self.probe_limit = probe_limit
+        self.probe_time = probe_time
+        self.search = search
+        self.max_discrepancies = max_discrepancies
+        
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.deadline = None
+        self.budget_status = None  # 'timeout' / 'node_limit' once a budget has run out
+        self.status = None
+        self.best_partial = {}
+        self.root_domains = None  # Domains before the first search, kept for later enumerations
+        self.random = random.Random(seed) if seed is not None else None
+        self.restarts = restarts
+        self.restart_base = restart_base
+        self.restart_limit = None  # failed_attempts value at which the current run gives up
+        self.restart_pending = False
+        
+        self.components = self._build_components() if decompose else [list(self.attr_keys)]
+        # A decomposed puzzle is searched by sub-solvers, which add their own ordering clues
+        self.symmetry_constraints = []
+        if symmetry_breaking and len(self.components) == 1:
+            self.symmetry_constraints = self._build_symmetry_constraints()
+            self.constraints = constraints + self.symmetry_constraints
+        self.binary_constraints = self._build_binary_constraints()
+        # Binary constraints per directed attribute pair, used to build the AC-3 arcs
+        self.arc_constraints = self._build_arc_constraints()
+        # Single-value clues are enforced on the domains once, by _apply_node_consistency
+        self.unary_constraints = [constraint for constraint in self.constraints if self._is_unary(constraint)]
+        self.value_watches, self.key_watches, self.unwatched_constraints = self._build_watches()
         self.domains = self._initialize_domains()
+        self.positions = self._initialize_positions()
+        
+        # Undo stack of (house, attr, previous mask); backtracking restores it to a mark
+        self.trail = []
+        
+        # Conflict sets are bitmasks of decision levels (bit L = the decision made at depth L).
+        # prune_reasons[h][a][v] explains why value v left house h; it is only read while the
+        # value is absent, so it needs no undo.
+        self.prune_reasons = [[[0] * len(values) for values in self.attr_values] for _ in range(self.num_House)]
+        self.active_reason = 0  # Reason of the current prunings, None = compute from active_pid
+        self.active_pid = None
+        self.conflict = 0  # Conflict set of the last failure
+        self.decision_stack = []  # (house, entity) decided at each level
+        self.decision_levels = {}
+        self.nogoods = deque()
+        self.nogood_watches = {}
+        
+        # Values tied together by identity clues form one entity that shares a single position
+        self.entity_of, self.entity_members, self.identity_conflict = self._build_entities()
+        self.entity_degrees = [0] * len(self.entity_members)
+        for _, a1, v1, a2, v2 in self.binary_constraints:
+            self.entity_degrees[self.entity_of[a1][v1]] += 1
+            self.entity_degrees[self.entity_of[a2][v2]] += 1
         
-        self.assignment = {}
+        # Propagators and the (value mask, propagator id) pairs subscribed to each attribute
+        self.propagators, self.subscriptions = self._build_propagators()
+        self.propagator_inputs = [self._get_propagator_inputs(propagator) for propagator in self.propagators]
+        
+        # dom/wdeg: failure counts per propagator, and the propagators reading each value / entity
+        self.propagator_weights = [1] * len(self.propagators)
+        self.value_propagators = [[0] * len(values) for values in self.attr_values]  # Bitmasks of pids
+        for a, subscribed in enumerate(self.subscriptions):
+            for watched, pid in subscribed:
+                for v in _iter_bits(watched):
+                    self.value_propagators[a][v] |= 1 << pid
+        self.entity_propagators = [[] for _ in self.entity_members]
+        for pid, inputs in enumerate(self.propagator_inputs):
+            for e in dict.fromkeys(self.entity_of[a][v] for a, v in inputs):
+                self.entity_propagators[e].append(pid)
+        self.queue = deque()
+        self.in_queue = [False] * len(self.propagators)
+        self.tensor = TensorPropagator([(attributes, self.constraints)]) if propagation == 'tensor' else None
+        
+        # Last house -> value matching per attribute, reused as a warm start by all-different
+        self.matchings = [[-1] * self.num_House for _ in self.attr_keys]
         
         self.backtrack_count = 0
         self.propagation_calls = 0
@@ -27,283 +276,986 @@ class ConstraintSolver:
         self.domain_reductions = 0  # Track every domain reduction operation
         self.failed_attempts = 0  # Track only failed assignments that need backtracking
         self.search_effort = 0  # Track minimal realistic effort metric
+        self.backjump_count = 0  # Track dead ends that skipped the remaining siblings
+        self.nogood_failures = 0  # Track branches cut by a learned nogood
+        self.restart_count = 0  # Track restarts from the root
+        self.solution_count = 0  # Track complete assignments reached by the search
+        self.probe_count = 0  # Track tentative assignments made by probing
+        self.probe_removals = 0  # Track values removed because their probe failed
+        self.discrepancy_cutoffs = 0  # Track nodes whose remaining choices the discrepancy limit cut
+        self.search_passes = 0  # Track passes from the root made by the search strategy
 
         self.search_trace = []
         self.start_time = time.time()
         
-    def _initialize_domains(self) -> Dict[int, Dict[str, set]]:
-        """Initialize domains: all possible values for each position-attribute pair."""
-        domains = {}
-        for pos in range(1, self.num_House + 1):
-            domains[pos] = {}
-            for attr_key, attr_values in self.attributes.items():
-                domains[pos][attr_key] = set(attr_values)
-        return domains
+    def _initialize_domains(self) -> List[List[int]]:
+        """Initialize domains: domains[house - 1][attr] is a bitmask of the still possible values."""
+        return [list(self.full_masks) for _ in range(self.num_House)]
+    
+    def _initialize_positions(self) -> List[List[int]]:
+        """Initialize the dual model: positions[attr][value] is a bitmask of the still possible houses."""
+        return [[self.full_house_mask] * len(values) for values in self.attr_values]
+    
+    def _set_domain(self, h: int, a: int, mask: int) -> None:
+        """
+        Narrow a domain, recording the previous mask on the trail so it can be undone,
+        channel the change into the position domains of the removed values, and wake
+        every propagator subscribed to one of them.
+        """
+        old_mask = self.domains[h][a]
+        self.trail.append((h, a, old_mask))
+        self.domains[h][a] = mask
+        
+        removed = old_mask & ~mask
+        positions = self.positions[a]
+        house_bit = ~(1 << h)
+        if self.backjumping:
+            reason = self.active_reason
+            if reason is None:
+                reason = self.active_reason = self._propagator_reason(self.active_pid)
+            reasons = self.prune_reasons[h][a]
+            for v in _iter_bits(removed):
+                positions[v] &= house_bit
+                reasons[v] = reason
+        else:
+            for v in _iter_bits(removed):
+                positions[v] &= house_bit
+        for watched, pid in self.subscriptions[a]:
+            if removed & watched and not self.in_queue[pid]:
+                self.in_queue[pid] = True
+                self.queue.append(pid)
+    
+    def _schedule_all(self) -> None:
+        """Queue every propagator, e.g. before the first propagation at the root."""
+        for pid in range(len(self.propagators)):
+            if not self.in_queue[pid]:
+                self.in_queue[pid] = True
+                self.queue.append(pid)
+    
+    def _clear_queue(self) -> None:
+        """Drop pending propagators after a failure; their input state is being undone."""
+        while self.queue:
+            self.in_queue[self.queue.pop()] = False
+    
+    def _undo(self, mark: int) -> None:
+        """Restore every domain changed since the trail had length `mark`."""
+        trail = self.trail
+        domains = self.domains
+        positions = self.positions
+        while len(trail) > mark:
+            h, a, mask = trail.pop()
+            for v in _iter_bits(mask & ~domains[h][a]):
+                positions[a][v] |= 1 << h
+            domains[h][a] = mask
+    
+    def _value_reason(self, a: int, v: int) -> int:
+        """Decision levels behind every house value v of attribute a has lost."""
+        reason = 0
+        for h in _iter_bits(self.full_house_mask & ~self.positions[a][v]):
+            reason |= self.prune_reasons[h][a][v]
+        return reason
+    
+    def _cell_reason(self, h: int, a: int) -> int:
+        """Decision levels behind every value house h has lost for attribute a."""
+        reason = 0
+        reasons = self.prune_reasons[h][a]
+        for v in _iter_bits(self.full_masks[a] & ~self.domains[h][a]):
+            reason |= reasons[v]
+        return reason
+    
+    def _propagator_reason(self, pid: int) -> int:
+        """Decision levels behind the current state of everything propagator pid reads."""
+        reason = 0
+        for a, v in self.propagator_inputs[pid]:
+            reason |= self._value_reason(a, v)
+        return reason
+    
+    def _get_propagator_inputs(self, propagator: tuple) -> List[Tuple[int, int]]:
+        """The (attr, value) position domains a propagator reads."""
+        kind = propagator[0]
+        if kind == 'alldiff':
+            return [(propagator[1], v) for v in range(len(self.attr_values[propagator[1]]))]
+        entities = propagator[2] if kind == 'constraint' else [propagator[1]]
+        return [member for e in entities for member in self.entity_members[e]]
+    
+    def _build_components(self) -> List[List[str]]:
+        """
+        Group the attribute keys into components: union-find over the attributes each clue
+        mentions. A clue without a parsed scope could involve anything, and attribute lists
+        of different lengths do not agree on the house count, so both keep the puzzle in
+        one piece.
+        """
+        # A sub-solver takes its house count from its own attributes, so uneven lists stay together
+        if len({len(values) for values in self.attributes.values()}) > 1:
+            return [list(self.attr_keys)]
+        
+        parent = {attr_key: attr_key for attr_key in self.attr_keys}
+        
+        def find(attr_key):
+            while parent[attr_key] != attr_key:
+                parent[attr_key] = parent[parent[attr_key]]
+                attr_key = parent[attr_key]
+            return attr_key
+        
+        for constraint in self.constraints:
+            scope = constraint.get_scope()
+            if not scope:
+                return [list(self.attr_keys)]
+            keys = [attr_key for _, attr_key in scope if attr_key in self.attr_index]
+            for attr_key in keys[1:]:
+                root1, root2 = find(keys[0]), find(attr_key)
+                if root1 != root2:
+                    parent[root2] = root1
+        
+        components = {}
+        for attr_key in self.attr_keys:
+            components.setdefault(find(attr_key), []).append(attr_key)
+        return list(components.values())
+    
+    def _build_symmetry_constraints(self) -> List[Constraint]:
+        """
+        Order the values of each attribute that no clue mentions: any solution stays a
+        solution when they swap houses, so require them left to right in list order.
+        A clue without a parsed scope might mention anything, so then nothing is added.
+        """
+        mentioned = set()
+        for constraint in self.constraints:
+            scope = constraint.get_scope()
+            if not scope:
+                return []
+            mentioned.update(scope)
+        
+        symmetry_constraints = []
+        for attr_key, values in zip(self.attr_keys, self.attr_values):
+            free = [(value, attr_key) for value in values if (value, attr_key) not in mentioned]
+            for attr1, attr2 in zip(free, free[1:]):
+                symmetry_constraints.append(SymmetryOrderConstrain(self.attributes, attr1, attr2))
+        return symmetry_constraints
+    
+    def _component_solvers(self, symmetry_breaking: bool = True) -> Iterator['ConstraintSolver']:
+        """
+        One sub-solver per component, created lazily so each gets the budget left over by the
+        ones before it. A clue goes to the component of the attributes it mentions; one that
+        mentions no known attribute can never fail and goes to the first component.
+        """
+        options = dict(self.options)
+        options['symmetry_breaking'] = options['symmetry_breaking'] and symmetry_breaking
+        component_of = {attr_key: i for i, keys in enumerate(self.components) for attr_key in keys}
+        component_constraints = [[] for _ in self.components]
+        for constraint in self.constraints:
+            keys = [attr_key for _, attr_key in constraint.get_scope() if attr_key in component_of]
+            component_constraints[component_of[keys[0]] if keys else 0].append(constraint)
+        
+        for keys, constraints in zip(self.components, component_constraints):
+            time_limit = None
+            if self.deadline is not None:
+                time_limit = max(0.0, self.deadline - time.time())
+            node_limit = None
+            if self.node_limit is not None:
+                node_limit = max(0, self.node_limit - self.backtrack_count)
+            yield ConstraintSolver({attr_key: self.attributes[attr_key] for attr_key in keys}, constraints,
+                                   time_limit=time_limit, node_limit=node_limit, **options)
+    
+    def _absorb(self, sub: 'ConstraintSolver') -> None:
+        """Add a sub-solver's effort counters and trace to this solver's."""
+        for counter in EFFORT_COUNTERS:
+            setattr(self, counter, getattr(self, counter) + getattr(sub, counter))
+        self._absorb_trace(sub)
+        if sub.budget_status is not None:
+            self.budget_status = sub.budget_status
+    
+    def _absorb_trace(self, sub: 'ConstraintSolver') -> None:
+        """
+        Append a sub-solver's trace rows in this solver's layout: steps continue this trace's
+        numbering, and the feature vector covers every attribute, taking the domain sizes of
+        attributes outside the sub-solver from this solver.
+        """
+        sub_columns = {}
+        for h in range(sub.num_House):
+            for a in sub.sorted_attrs:
+                sub_columns[(h, sub.attr_keys[a])] = len(sub_columns)
+        
+        for row in sub.search_trace:
+            step, houseNr, attr_key, value = row[:4]
+            sub_features = row[4:]
+            features = []
+            for h in range(self.num_House):
+                for a in self.sorted_attrs:
+                    column = sub_columns.get((h, self.attr_keys[a]))
+                    features.append(sub_features[column] if column is not None else _popcount(self.domains[h][a]))
+            self.search_trace.append([len(self.search_trace) + 1, houseNr, attr_key, value] + features)
+    
+    def _merge_partials(self, parts: List[Dict[int, Dict[str, str]]]) -> Dict[int, Dict[str, str]]:
+        """Combine per-component (partial) grids house by house."""
+        merged = {}
+        for part in parts:
+            for houseNr, values in part.items():
+                merged.setdefault(houseNr, {}).update(values)
+        return merged
+    
+    def _solve_components(self) -> Optional[Dict[int, Dict[str, str]]]:
+        """Solve every component on its own; the puzzle fails as soon as one of them does."""
+        solutions = []
+        for sub in self._component_solvers():
+            result = sub.solve()
+            self._absorb(sub)
+            if result is None:
+                self.best_partial = self._merge_partials(solutions + [sub.best_partial])
+                return None
+            solutions.append(result)
+        return self._merge_partials(solutions)
+    
+    def _build_binary_constraints(self) -> List[Tuple[Constraint, int, int, int, int]]:
+        """
+        Collect the binary constraints as (constraint, attr1, value1, attr2, value2) so the
+        solver can hand their filter_positions routine the positions of both values.
+        """
+        binary_constraints = []
+        for constraint in self.constraints:
+            scope = constraint.get_scope()
+            if len(scope) != 2 or scope[0] == scope[1]:
+                continue
+            interned1 = self.index.intern(scope[0])
+            interned2 = self.index.intern(scope[1])
+            if interned1 is None or interned2 is None:
+                continue
+            binary_constraints.append((constraint, interned1[0], interned1[1], interned2[0], interned2[1]))
+        return binary_constraints
+    
+    def _build_entities(self) -> Tuple[List[List[int]], List[List[Tuple[int, int]]], bool]:
+        """
+        Union-find pass over the identity clues: values that must share a house are merged
+        into one entity. Returns entity_of[attr][value], the (attr, value) members of each
+        entity, and whether some entity holds two values of the same attribute (unsolvable).
+        """
+        parent = {}
+        
+        def find(node):
+            while parent.get(node, node) != node:
+                parent[node] = parent.get(parent[node], parent[node])
+                node = parent[node]
+            return node
+        
+        for constraint in self.constraints:
+            pair = constraint.get_identity_pair()
+            if pair is None:
+                continue
+            node1, node2 = self.index.intern(pair[0]), self.index.intern(pair[1])
+            if node1 is None or node2 is None:
+                continue
+            root1, root2 = find(node1), find(node2)
+            if root1 != root2:
+                parent[root2] = root1
+        
+        entity_of = [[-1] * len(values) for values in self.attr_values]
+        entity_members = []
+        root_entity = {}
+        for a in self.sorted_attrs:
+            for v in range(len(self.attr_values[a])):
+                root = find((a, v))
+                if root not in root_entity:
+                    root_entity[root] = len(entity_members)
+                    entity_members.append([])
+                entity_of[a][v] = root_entity[root]
+                entity_members[root_entity[root]].append((a, v))
+        
+        identity_conflict = any(
+            len({a for a, _ in members}) != len(members) for members in entity_members
+        )
+        return entity_of, entity_members, identity_conflict
+    
+    def _build_propagators(self) -> Tuple[List[tuple], List[List[Tuple[int, int]]]]:
+        """
+        Build the propagators run by _propagate and subscribe each one to the values it reads.
+        Clues are rewritten onto entities, so identity clues themselves need no propagator:
+        - ('alldiff', attr): global all-different for one attribute, woken by any change of it
+        - ('entity', entity): keeps the members of a merged entity on the same houses
+        - ('constraint', constraint, scope): filter_positions over the scope's entities
+        - ('mask', entity, allowed): a clue whose values all belong to one entity, reduced to
+          the houses where is_valid accepts them together
+        """
+        propagators = []
+        subscriptions = [[] for _ in self.attr_keys]
+        
+        def add(propagator, entities):
+            pid = len(propagators)
+            propagators.append(propagator)
+            for e in entities:
+                for a, v in self.entity_members[e]:
+                    subscriptions[a].append((1 << v, pid))
+        
+        for a in range(len(self.attr_keys)):
+            subscriptions[a].append((self.full_masks[a], len(propagators)))
+            propagators.append(('alldiff', a))
+        
+        for e, members in enumerate(self.entity_members):
+            if len(members) > 1:
+                add(('entity', e), [e])
+        
+        for constraint, interned in self.index.clues(self.constraints):
+            if constraint.get_identity_pair() is not None or len(interned) == 1:
+                continue
+            
+            scope = [self.entity_of[a][v] for a, v in interned]
+            if len(scope) == 2 and scope[0] == scope[1]:
+                same_house = {}
+                for value, attr_key in constraint.get_scope():
+                    same_house[attr_key] = value
+                allowed = 0
+                for h in range(self.num_House):
+                    if constraint.is_valid({h + 1: same_house}):
+                        allowed |= 1 << h
+                add(('mask', scope[0], allowed), [scope[0]])
+                continue
+            
+            add(('constraint', constraint, scope), scope)
+        
+        return propagators, subscriptions
+    
+    def _build_watches(self) -> Tuple[Dict[Tuple[str, str], List[Constraint]], Dict[str, List[Constraint]], List[Constraint]]:
+        """
+        Index the constraints by what can change their verdict when it gets assigned:
+        binary constraints by their (attr_key, value) pairs, unary ones by attr_key (a
+        house-number clue is also violated by another value landing in its house).
+        Unary clues over known values are left out: node consistency already removed every
+        house where they could fail. Constraints without a parsed scope are re-checked on
+        every assignment.
+        """
+        value_watches = {}
+        key_watches = {}
+        unwatched_constraints = []
+        for constraint in self.constraints:
+            scope = constraint.get_scope()
+            if self._is_unary(constraint):
+                continue
+            if not scope:
+                unwatched_constraints.append(constraint)
+            elif len(scope) == 1:
+                _, attr_key = scope[0]
+                key_watches.setdefault(attr_key, []).append(constraint)
+            else:
+                for value, attr_key in set(scope):
+                    value_watches.setdefault((attr_key, value), []).append(constraint)
+        return value_watches, key_watches, unwatched_constraints
+    
+    def _is_unary(self, constraint: Constraint) -> bool:
+        """True for a clue about a single known value (absolute position or house-number identity)."""
+        scope = constraint.get_scope()
+        return len(scope) == 1 and self.index.intern(scope[0]) is not None
+    
+    def _apply_node_consistency(self) -> bool:
+        """Narrow the positions of every unary clue's entity once, before AC-3; False if one empties."""
+        for constraint in self.unary_constraints:
+            a, v = self.index.intern(constraint.get_scope()[0])
+            e = self.entity_of[a][v]
+            positions = self._entity_positions(e)
+            narrowed = constraint.filter_positions([positions], self.num_House)
+            if narrowed is None or not narrowed[0]:
+                return False
+            if narrowed[0] != positions and not self._restrict_entity(e, narrowed[0]):
+                return False
+        return True
+    
+    def _entity_positions(self, e: int) -> int:
+        """Houses every member of entity e can still occupy."""
+        members = self.entity_members[e]
+        a, v = members[0]
+        positions = self.positions[a][v]
+        for a, v in members[1:]:
+            positions &= self.positions[a][v]
+        return positions
+    
+    def _restrict_entity(self, e: int, new_positions: int) -> bool:
+        """Narrow every member of entity e to new_positions; False on a wipe-out."""
+        for a, v in self.entity_members[e]:
+            old_positions = self.positions[a][v]
+            if old_positions & ~new_positions:
+                if not self._restrict_positions(a, v, old_positions, old_positions & new_positions):
+                    return False
+        return True
+    
+    def _restrict_positions(self, a: int, v: int, old_positions: int, new_positions: int) -> bool:
+        """Remove value v from every house dropped from its positions; False on a wipe-out."""
+        bit = 1 << v
+        for h in _iter_bits(old_positions & ~new_positions):
+            self._set_domain(h, a, self.domains[h][a] & ~bit)
+            self.domain_reductions += 1
+            if self.domains[h][a] == 0:
+                if self.backjumping:
+                    self.conflict |= self._cell_reason(h, a)
+                return False
+        return True
+    
+    def restrict_domains(self, masks: List[List[int]]) -> None:
+        """
+        Narrow the starting domains to masks[h][a] (bit v = value v still possible), e.g. to
+        what a batched propagation already derived. Call before solving. A decomposed puzzle
+        is solved by fresh sub-solvers, which derive the same reductions on their own.
+        """
+        self.active_reason = 0  # Root reductions depend on no decision
+        for h, row in enumerate(masks):
+            for a, mask in enumerate(row):
+                narrowed = self.domains[h][a] & mask
+                if narrowed != self.domains[h][a]:
+                    self._set_domain(h, a, narrowed)
     
     def solve(self) -> Optional[Dict[int, Dict[str, str]]]:
         """Apply AC-3 preprocessing, then solve via backtracking with forward checking."""
+        if len(self.components) > 1:
+            self.start_time = time.time()
+            if self.time_limit is not None:
+                self.deadline = self.start_time + self.time_limit
+            result = self._solve_components()
+        else:
+            result = self._solve() if self._preprocess() else None
+        if result is not None:
+            self.status = 'solved'
+            self.best_partial = {houseNr: dict(values) for houseNr, values in result.items()}
+        else:
+            self.status = self.budget_status or 'unsat'
+        return result
+    
+    def _solve(self) -> Optional[Dict[int, Dict[str, str]]]:
+        """Search for the first solution, restarting on schedule if restarts are on."""
+        if self.restarts is None:
+            return next(self._search_root(), None)
+        
+        run = 0
+        while True:
+            run += 1
+            if self.restarts == 'luby':
+                cutoff = self.restart_base * luby(run)
+            else:
+                cutoff = int(self.restart_base * 1.5 ** (run - 1))
+            self.restart_limit = self.failed_attempts + cutoff
+            self.restart_pending = False
+            
+            result = next(self._search_root(), None)
+            if not self.restart_pending or self.budget_status is not None:
+                return result
+            self.restart_count += 1
+    
+    def iter_solutions(self, limit: Optional[int] = None) -> Iterator[Dict[int, Dict[str, str]]]:
+        """
+        Yield up to `limit` solutions (all of them if None), each as a copy. The search
+        resumes from where the previous solution was found, so the preprocessing and the
+        propagated state are shared. Restarts and symmetry breaking are not used while
+        enumerating. After solve() or an earlier enumeration the search state is spent, so
+        a fresh copy enumerates from the domains this solver started with.
+        """
+        if limit is not None and limit <= 0:
+            return
+        self.status = 'unsat'
+        if len(self.components) > 1:
+            yield from self._iter_component_solutions(limit)
+            return
+        if self.symmetry_constraints or self.root_domains is not None:
+            yield from self._iter_fresh_solutions(limit)
+            return
+        if not self._preprocess():
+            self.status = self.budget_status or 'unsat'
+            return
+        
+        found = 0
+        for solution in self._search_root():
+            solution = {houseNr: dict(values) for houseNr, values in solution.items()}
+            self.status = 'solved'
+            self.best_partial = solution
+            yield solution
+            found += 1
+            if limit is not None and found >= limit:
+                return
+        if not found:
+            self.status = self.budget_status or 'unsat'
+    
+    def _iter_component_solutions(self, limit: Optional[int]) -> Iterator[Dict[int, Dict[str, str]]]:
+        """
+        Solutions of a decomposed puzzle: the product of the components' solutions. No more
+        than `limit` per component are ever needed for `limit` combinations.
+        """
+        self.start_time = time.time()
+        if self.time_limit is not None:
+            self.deadline = self.start_time + self.time_limit
+        
+        per_component = []
+        for sub in self._component_solvers(symmetry_breaking=False):
+            solutions = list(sub.iter_solutions(limit))
+            self._absorb(sub)
+            if not solutions:
+                self.status = self.budget_status or 'unsat'
+                return
+            per_component.append(solutions)
+        
+        for found, combination in enumerate(itertools.product(*per_component)):
+            if limit is not None and found >= limit:
+                return
+            solution = self._merge_partials(list(combination))
+            self.status = 'solved'
+            self.best_partial = solution
+            yield solution
+    
+    def _iter_fresh_solutions(self, limit: Optional[int]) -> Iterator[Dict[int, Dict[str, str]]]:
+        """
+        Solutions enumerated by a fresh copy of this solver without symmetry-order clues (they
+        would drop every solution that merely swaps unmentioned values), starting from the
+        domains this solver had before its first search.
+        """
+        constraints = self.constraints[:len(self.constraints) - len(self.symmetry_constraints)]
+        options = dict(self.options)
+        options['symmetry_breaking'] = False
+        sub = ConstraintSolver(self.attributes, constraints, time_limit=self.time_limit,
+                               node_limit=self.node_limit, **options)
+        sub.restrict_domains(self.root_domains if self.root_domains is not None else self.domains)
+        try:
+            for solution in sub.iter_solutions(limit):
+                self.status = 'solved'
+                self.best_partial = solution
+                yield solution
+        finally:
+            self._absorb(sub)
+        self.status = sub.status
+    
+    def _search_root(self) -> Iterator[Assignment]:
+        """Run the configured search strategy from the root, yielding the live assignment."""
+        return getattr(self, '_search_' + self.search)()
+    
+    def _search_dfs(self) -> Iterator[Assignment]:
+        """Plain depth-first search."""
+        self.search_passes += 1
+        return self._backtrack(Assignment())
+    
+    def _search_lds(self) -> Iterator[Assignment]:
+        """One pass of limited discrepancy search."""
+        self.search_passes += 1
+        cutoffs = self.discrepancy_cutoffs
+        limit = self.max_discrepancies if self.max_discrepancies is not None else 1
+        yield from self._backtrack(Assignment(), limit)
+        if self.discrepancy_cutoffs > cutoffs and not self.restart_pending and self.budget_status is None:
+            self.budget_status = 'discrepancy_limit'
+    
+    def _search_ilds(self) -> Iterator[Assignment]:
+        """
+        Iterative LDS: one pass per discrepancy limit, from 0 up. A pass that never hit its
+        limit has searched the whole tree and ends the search. Later passes revisit the
+        solutions of earlier ones; those are not yielded again.
+        """
+        seen = set()
+        limit = 0
+        while True:
+            self.search_passes += 1
+            cutoffs = self.discrepancy_cutoffs
+            for solution in self._backtrack(Assignment(), limit):
+                key = frozenset((houseNr, attr_key, value)
+                                for houseNr, values in solution.items() for attr_key, value in values.items())
+                if key not in seen:
+                    seen.add(key)
+                    yield solution
+            
+            if self.restart_pending or self.budget_status is not None or self.discrepancy_cutoffs == cutoffs:
+                return
+            if self.max_discrepancies is not None and limit >= self.max_discrepancies:
+                self.budget_status = 'discrepancy_limit'
+                return
+            limit += 1
+    
+    def count_solutions(self, limit: int = 2) -> int:
+        """
+        Count solutions, stopping at `limit`. The default answers "is the solution unique?"
+        (1 = unique, 2 = more than one, 0 = none) for the price of one extended search.
+        Symmetry breaking is ignored whatever the constructor was given, so values a missed
+        clue leaves interchangeable show up as several solutions.
+        """
+        return sum(1 for _ in self.iter_solutions(limit))
+    
+    def _preprocess(self) -> bool:
+        """Root reasoning before search: identities, unary clues, AC-3, propagation, probing."""
+        self.root_domains = [list(row) for row in self.domains]
+        self.start_time = time.time()
+        if self.time_limit is not None:
+            self.deadline = self.start_time + self.time_limit
+        
+        if self.identity_conflict:
+            return False
+        
+        self._schedule_all()
+        
+        if not self._apply_node_consistency():
+            return False
+        
         if not self._ac3():
-            return None
+            return False
         
         if not self._propagate():
-            return None
+            return False
         
-        return self._backtrack({})
+        if self.probing is not None and not self._probe(1):
+            return False
+        
+        return True
     
     def _propagate(self) -> bool:
-        """Forward checking: propagate constraints iteratively until fixpoint."""
+        """Forward checking: run woken propagators until the queue is empty (fixpoint)."""
         self.propagation_calls += 1
+        queue = self.queue
+        self.conflict = 0
+        runs = 0
         
-        changed = True
-        iterations = 0
-        max_iterations = 50  # Prevent infinite loops
+        if self.tensor is not None:
+            return self._propagate_tensor()
         
-        while changed and iterations < max_iterations:
-            changed = False
-            iterations += 1
-            
-            # All-different: each value appears at most once per attribute
-            for attr_key in sorted(self.attributes.keys()):
-                for value in sorted(self.attributes[attr_key]):
-                    positions_with_value = []
-                    for houseNr in range(1, self.num_House + 1):
-                        if value in self.domains[houseNr][attr_key]:
-                            positions_with_value.append(houseNr)
-                    
-                    # If value can only go in one position, assign it
-                    if len(positions_with_value) == 1:
-                        houseNr = positions_with_value[0]
-                        if len(self.domains[houseNr][attr_key]) > 1:
-                            self.domains[houseNr][attr_key] = {value}
-                            self.domain_reductions += 1
-                            changed = True
-                    
-                    # If value has no valid position, conflict
-                    elif len(positions_with_value) == 0:
-                        return False
-            
-            # Unit propagation: remove assigned values from other positions
-            for houseNr in range(1, self.num_House + 1):
-                for attr_key in sorted(self.attributes.keys()):
-                    if len(self.domains[houseNr][attr_key]) == 1:
-                        value = list(self.domains[houseNr][attr_key])[0]
-                        for other_houseNr in range(1, self.num_House + 1):
-                            if other_houseNr != houseNr and value in self.domains[other_houseNr][attr_key]:
-                                self.domains[other_houseNr][attr_key].discard(value)
-                                self.domain_reductions += 1
-                                changed = True
-                                if len(self.domains[other_houseNr][attr_key]) == 0:
-                                    return False
-            
-            # Apply constraint-based propagation
-            for constraint in self.constraints:
-                if not hasattr(constraint, 'attr1') or not hasattr(constraint, 'attr2'):
-                    continue
-                if not constraint.attr1 or not constraint.attr2:
-                    continue
-                
-                _, attr1_key = constraint.attr1
-                _, attr2_key = constraint.attr2
-                
-                # For each position, check if constraint eliminates values
-                for houseNr in range(1, self.num_House + 1):
-                    # Check attr1 values
-                    if attr1_key in self.attributes and len(self.domains[houseNr][attr1_key]) > 1:
-                        values_to_remove = set()
-                        for val1 in list(self.domains[houseNr][attr1_key]):
-                            # Check if this value has any valid support
-                            has_support = False
-                            for other_pos in range(1, self.num_House + 1):
-                                if attr2_key in self.attributes:
-                                    for val2 in self.domains[other_pos][attr2_key]:
-                                        test_sol = {houseNr: {attr1_key: val1}, other_pos: {attr2_key: val2}}
-                                        if constraint.is_valid(test_sol):
-                                            has_support = True
-                                            break
-                                if has_support:
-                                    break
-                            if not has_support:
-                                values_to_remove.add(val1)
-                        
-                        if values_to_remove:
-                            self.domains[houseNr][attr1_key] -= values_to_remove
-                            self.domain_reductions += len(values_to_remove)
-                            changed = True
-                            if len(self.domains[houseNr][attr1_key]) == 0:
-                                return False
+        while queue:
+            # A long fixpoint can outlast the time budget; look at the clock every 64 runs
+            runs += 1
+            if runs & 63 == 0 and self._out_of_time():
+                self._clear_queue()
+                return False
             
-            # Apply unary constraints
-            for houseNr in range(1, self.num_House + 1):
-                for attr_key in sorted(self.attributes.keys()):
-                    if len(self.domains[houseNr][attr_key]) == 0:
-                        return False
-                    
-                    # Remove values violating position-specific constraints
-                    if len(self.domains[houseNr][attr_key]) > 1:
-                        values_to_remove = set()
-                        for value in list(self.domains[houseNr][attr_key]):
-                            test_solution = self._build_partial_solution()
-                            test_solution[houseNr][attr_key] = value
-                            
-                            if not self._is_consistent(test_solution):
-                                values_to_remove.add(value)
-                        
-                        if values_to_remove:
-                            self.domains[houseNr][attr_key] -= values_to_remove
-                            self.domain_reductions += len(values_to_remove)
-                            changed = True
-                            if len(self.domains[houseNr][attr_key]) == 0:
-                                return False
+            pid = queue.popleft()
+            self.in_queue[pid] = False
+            self.active_reason = None
+            self.active_pid = pid
+            if not self._run_propagator(self.propagators[pid]):
+                self.propagator_weights[pid] += 1
+                if self.backjumping:
+                    self.conflict |= self._propagator_reason(pid)
+                self._clear_queue()
+                return False
+        
+        return True
+    
+    def _propagate_tensor(self) -> bool:
+        """
+        The same fixpoint as vectorized sweeps over the whole domain tensor. The queue only
+        tells whether anything changed since the last fixpoint; the narrowed domains are
+        written back through _set_domain so the trail can undo them.
+        """
+        if not self.queue:
+            return True
+        self._clear_queue()
+        if self._out_of_time():
+            return False
+        
+        domains = self.tensor.from_masks([self.domains])
+        if not self.tensor.propagate(domains)[0]:
+            return False
         
+        for h, row in enumerate(self.tensor.to_masks(domains)[0]):
+            for a, mask in enumerate(row):
+                if mask != self.domains[h][a]:
+                    self._set_domain(h, a, mask)
+                    self.domain_reductions += 1
+        self._clear_queue()
         return True
     
+    def _record_partial(self) -> None:
+        """Keep the cells fixed so far (assigned or reduced to one value) if they beat best_partial."""
+        fixed = [(h, a) for h in range(self.num_House) for a in self.sorted_attrs
+                 if self.domains[h][a] & (self.domains[h][a] - 1) == 0]
+        if len(fixed) <= sum(len(values) for values in self.best_partial.values()):
+            return
+        partial = {}
+        for h, a in fixed:
+            v = self.domains[h][a].bit_length() - 1
+            partial.setdefault(h + 1, {})[self.attr_keys[a]] = self.attr_values[a][v]
+        self.best_partial = partial
+    
+    def _out_of_time(self) -> bool:
+        """Check the wall-clock budget, recording a timeout once it has passed."""
+        if self.budget_status is None and self.deadline is not None and time.time() > self.deadline:
+            self.budget_status = 'timeout'
+        return self.budget_status is not None
+    
+    def _run_propagator(self, propagator: tuple) -> bool:
+        """Apply one propagator to the current domains; False if it detects a conflict."""
+        kind = propagator[0]
+        
+        if kind == 'alldiff':
+            return self._propagate_all_different(propagator[1])
+        
+        if kind == 'entity':
+            positions = self._entity_positions(propagator[1])
+            return positions != 0 and self._restrict_entity(propagator[1], positions)
+        
+        if kind == 'mask':
+            _, e, allowed = propagator
+            positions = self._entity_positions(e) & allowed
+            return positions != 0 and self._restrict_entity(e, positions)
+        
+        # Apply constraint-based propagation directly on the position domains of its entities
+        _, constraint, scope = propagator
+        positions = [self._entity_positions(e) for e in scope]
+        narrowed = constraint.filter_positions(positions, self.num_House)
+        if narrowed is None or not all(narrowed):
+            return False
+        
+        for e, old_positions, new_positions in zip(scope, positions, narrowed):
+            if new_positions != old_positions and not self._restrict_entity(e, new_positions):
+                return False
+        return True
+    
+    def _propagate_all_different(self, a: int) -> bool:
+        """
+        Global all-different for one attribute (Regin): find a maximum matching of houses
+        to values, then keep only the edges that belong to some maximum matching, i.e.
+        matching edges, edges inside a strongly connected component of the alternating
+        graph, and edges on an alternating path from a free value.
+        """
+        domains = self.domains
+        num_House = self.num_House
+        
+        # Every value must get a house
+        if not all(self.positions[a]):
+            return False
+        
+        mate = self._match_houses(a)
+        if mate is None:
+            return False
+        
+        # Alternating graph: house h -> its matched value, value v -> every other house
+        # that still has v. Nodes 0..num_House-1 are houses, num_House + v are values.
+        num_values = len(self.attr_values[a])
+        matched_values = 0
+        for v in mate:
+            matched_values |= 1 << v
+        successors = [[num_House + mate[h]] for h in range(num_House)]
+        successors += [[] for _ in range(num_values)]
+        for h in range(num_House):
+            for v in _iter_bits(domains[h][a] & ~(1 << mate[h])):
+                successors[num_House + v].append(h)
+        
+        # Values reachable from a free value lie on an even alternating path
+        reachable = 0
+        stack = [num_House + v for v in _iter_bits(self.full_masks[a] & ~matched_values)]
+        seen = set(stack)
+        while stack:
+            node = stack.pop()
+            if node >= num_House:
+                reachable |= 1 << (node - num_House)
+            for succ in successors[node]:
+                if succ not in seen:
+                    seen.add(succ)
+                    stack.append(succ)
+        
+        component = self._strongly_connected_components(successors)
+        
+        for h in range(num_House):
+            keep = 1 << mate[h]
+            for v in _iter_bits(domains[h][a] & ~keep):
+                if component[num_House + v] == component[h] or reachable >> v & 1:
+                    keep |= 1 << v
+            if domains[h][a] & ~keep:
+                self.domain_reductions += _popcount(domains[h][a] & ~keep)
+                self._set_domain(h, a, domains[h][a] & keep)
+        
+        return True
+    
+    def _match_houses(self, a: int) -> Optional[List[int]]:
+        """
+        Maximum matching of houses to values of attribute a by augmenting paths, warm-started
+        from the last matching found. Returns the value index per house, None if some
+        house cannot be matched.
+        """
+        domains = self.domains
+        mate = self.matchings[a]
+        owner = {}
+        for h in range(self.num_House):
+            v = mate[h]
+            if v >= 0 and domains[h][a] >> v & 1:
+                owner[v] = h
+            else:
+                mate[h] = -1
+        
+        def augment(h: int, visited: List[int]) -> bool:
+            for v in _iter_bits(domains[h][a] & ~visited[0]):
+                visited[0] |= 1 << v
+                if v not in owner or augment(owner[v], visited):
+                    owner[v] = h
+                    mate[h] = v
+                    return True
+            return False
+        
+        for h in range(self.num_House):
+            if mate[h] < 0 and not augment(h, [0]):
+                return None
+        return mate
+    
+    def _strongly_connected_components(self, successors: List[List[int]]) -> List[int]:
+        """Tarjan's algorithm; returns a component id per node."""
+        index = [-1] * len(successors)
+        lowlink = [0] * len(successors)
+        component = [-1] * len(successors)
+        on_stack = [False] * len(successors)
+        stack = []
+        counter = [0, 0]  # next index, next component id
+        
+        def visit(node: int) -> None:
+            index[node] = lowlink[node] = counter[0]
+            counter[0] += 1
+            stack.append(node)
+            on_stack[node] = True
+            for succ in successors[node]:
+                if index[succ] < 0:
+                    visit(succ)
+                    lowlink[node] = min(lowlink[node], lowlink[succ])
+                elif on_stack[succ]:
+                    lowlink[node] = min(lowlink[node], index[succ])
+            if lowlink[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component[member] = counter[1]
+                    if member == node:
+                        break
+                counter[1] += 1
+        
+        for node in range(len(successors)):
+            if index[node] < 0:
+                visit(node)
+        return component
+    
     def _ac3(self) -> bool:
         """AC-3 algorithm: enforce arc consistency on constraint graph."""
-        # Build initial queue with only relevant arcs based on constraints
-        queue = self._get_initial_arcs()
+        arc_masks = self._build_arc_masks()
+        
+        # Arcs (Xk, Xi) to re-check when the domain of Xi shrinks
+        incoming = {}
+        for x_k, x_i in arc_masks:
+            incoming.setdefault(x_i, []).append(x_k)
+        
+        queue = deque(sorted(arc_masks))
         queue_set = set(queue)  # For O(1) membership testing
         
         while queue:
-            arc = queue.pop(0)
+            arc = queue.popleft()
             queue_set.discard(arc)
-            (houseNr_i, attr_key_i), (houseNr_j, attr_key_j) = arc
+            x_i, x_j = arc
             
             # Revise the domain of variable Xi
-            if self._revise(houseNr_i, attr_key_i, houseNr_j, attr_key_j):
+            if self._revise(x_i, x_j, arc_masks[arc]):
                 # If domain of Xi became empty, no solution exists
-                if len(self.domains[houseNr_i][attr_key_i]) == 0:
+                if self.domains[x_i[0]][x_i[1]] == 0:
                     return False
                 
-                # If the domain of Xi was reduced, re-add all arcs pointing to Xi
-                for houseNr_k in range(1, self.num_House + 1):
-                    for attr_key_k in self.attributes.keys():
-                        if (houseNr_k, attr_key_k) != (houseNr_i, attr_key_i) and \
-                           (houseNr_k, attr_key_k) != (houseNr_j, attr_key_j):
-                            reverse_arc = ((houseNr_k, attr_key_k), (houseNr_i, attr_key_i))
-                            if reverse_arc not in queue_set:
-                                queue.append(reverse_arc)
-                                queue_set.add(reverse_arc)
+                # If the domain of Xi was reduced, re-add the arcs from its constraint neighbours
+                for x_k in incoming.get(x_i, ()):
+                    if x_k != x_j:
+                        reverse_arc = (x_k, x_i)
+                        if reverse_arc not in queue_set:
+                            queue.append(reverse_arc)
+                            queue_set.add(reverse_arc)
         
         return True
     
-    def _get_initial_arcs(self) -> List[Tuple[Tuple[int, str], Tuple[int, str]]]:
-        """Generate arcs for relevant attribute pairs based on constraints."""
-        relevant_attr_pairs = set()
-        
-        # Extract relevant attribute pairs from constraints
-        for constraint in self.constraints:
-            attr_pair = self._get_constraint_attribute_pair(constraint)
-            if attr_pair:
-                attr_key1, attr_key2 = attr_pair
-                # Add both directions as potential relevant pairs
-                relevant_attr_pairs.add((attr_key1, attr_key2))
-                if attr_key1 != attr_key2:
-                    relevant_attr_pairs.add((attr_key2, attr_key1))
-        
-        # Also add all-different constraints between same attribute
-        for attr_key in self.attributes.keys():
-            relevant_attr_pairs.add((attr_key, attr_key))
-        
-        # Create arcs for relevant attribute pairs
-        arcs = []
-        for attr_key1, attr_key2 in sorted(relevant_attr_pairs):
-            for houseNr1 in range(1, self.num_House + 1):
-                for houseNr2 in range(1, self.num_House + 1):
-                    if (houseNr1, attr_key1) != (houseNr2, attr_key2):
-                        arcs.append(((houseNr1, attr_key1), (houseNr2, attr_key2)))
-        
-        return arcs
-    
-    def _get_constraint_attribute_pair(self, constraint: Constraint) -> Optional[Tuple[str, str]]:
-        """Extract attribute pair from constraint, None if unary."""
-        if hasattr(constraint, 'attr1') and hasattr(constraint, 'attr2'):
-            if constraint.attr1 and constraint.attr2:
-                _, attr_key1 = constraint.attr1
-                _, attr_key2 = constraint.attr2
-                return (attr_key1, attr_key2)
-        
-        return None
+    def _build_arc_constraints(self) -> Dict[Tuple[int, int], List[Tuple[Constraint, int, int, bool]]]:
+        """
+        Index the binary constraints by directed attribute pair: arc_constraints[(a_i, a_j)]
+        lists (constraint, v_i, v_j, reversed), where reversed means v_i is the constraint's
+        second value. Every attribute is paired with itself for the all-different arcs.
+        """
+        arc_constraints = {(a, a): [] for a in range(len(self.attr_keys))}
+        for constraint, a1, v1, a2, v2 in self.binary_constraints:
+            arc_constraints.setdefault((a1, a2), []).append((constraint, v1, v2, False))
+            arc_constraints.setdefault((a2, a1), []).append((constraint, v2, v1, True))
+        return arc_constraints
     
-    def _revise(self, houseNr_i: int, attr_key_i: str, houseNr_j: int, attr_key_j: str) -> bool:
-        """Remove values from (houseNr_i, attr_key_i) with no support in (houseNr_j, attr_key_j)."""
-        revised = False
-        values_to_remove = set()
-        
-        # Get only constraints that involve both attributes
-        relevant_constraints = [
-            c for c in self.constraints 
-            if hasattr(c, 'attr1') and hasattr(c, 'attr2') 
-            and c.attr1 and c.attr2
-        ]
-        
-        for value_i in sorted(self.domains[houseNr_i][attr_key_i]):
-            # Check if there exists a value in Xj's domain that supports value_i
-            has_support = False
-            
-            for value_j in sorted(self.domains[houseNr_j][attr_key_j]):
-                # Quick check: only test if attributes match constraint pattern
-                is_valid = True
-                
-                for constraint in relevant_constraints:
-                    _, attr1_key = constraint.attr1
-                    _, attr2_key = constraint.attr2
-                    
-                    # Check if this constraint applies to our variables
-                    if (attr_key_i == attr1_key and attr_key_j == attr2_key) or \
-                       (attr_key_i == attr2_key and attr_key_j == attr1_key):
-                        # Build minimal test solution
-                        test_sol = {houseNr_i: {attr_key_i: value_i},
-                                   houseNr_j: {attr_key_j: value_j}}
-                        if not constraint.is_valid(test_sol):
-                            is_valid = False
-                            break
-                
-                if is_valid:
-                    has_support = True
-                    break
+    def _build_arc_masks(self) -> Dict[Tuple[Tuple[int, int], Tuple[int, int]], List[int]]:
+        """
+        Generate the arcs ((h_i, a_i), (h_j, a_j)) whose relation can prune anything, each with
+        forbidden[v]: the mask of values of Xj that cannot coexist with value v of Xi.
+        Arcs between cells no clue relates are left out.
+        """
+        arc_masks = {}
+        for (a_i, a_j), entries in self.arc_constraints.items():
+            # houses[h_i][k]: where the other value of entry k may sit when v_i is in house h_i
+            relations = [constraint.relation(self.num_House, reversed_scope)
+                         for constraint, _, _, reversed_scope in entries]
+            houses = [[relation[h_i] for relation in relations] for h_i in range(self.num_House)]
             
-            # If no supporting value found, remove value_i from domain
-            if not has_support:
-                values_to_remove.add(value_i)
-                revised = True
+            # All-different alone forbids only the same value; shared by every arc it covers
+            base = [1 << v if a_i == a_j else 0 for v in range(len(self.attr_values[a_i]))]
+            for h_i in range(self.num_House):
+                for h_j in range(self.num_House):
+                    if (h_i, a_i) == (h_j, a_j):
+                        continue
+                    forbidden = base
+                    for (_, v_i, v_j, _), allowed in zip(entries, houses[h_i]):
+                        if not allowed >> h_j & 1:
+                            if forbidden is base:
+                                forbidden = list(base)
+                            forbidden[v_i] |= 1 << v_j
+                    if a_i == a_j or forbidden is not base:
+                        arc_masks[((h_i, a_i), (h_j, a_j))] = forbidden
         
-        self.domains[houseNr_i][attr_key_i] -= values_to_remove
-        return revised
+        return arc_masks
     
-    def _backtrack(self, assignment: Dict[int, Dict[str, str]]) -> Optional[Dict[int, Dict[str, str]]]:
-        """Depth-first search with backtracking, logging and forward checking."""
+    def _revise(self, x_i: Tuple[int, int], x_j: Tuple[int, int], forbidden: List[int]) -> bool:
+        """Remove values from Xi with no support in Xj, given the arc's forbidden masks."""
+        h_i, a_i = x_i
+        domain_j = self.domains[x_j[0]][x_j[1]]
+        values_to_remove = 0
+        
+        for v in _iter_bits(self.domains[h_i][a_i]):
+            # If no supporting value is left in Xj, remove v from Xi
+            if domain_j & ~forbidden[v] == 0:
+                values_to_remove |= 1 << v
+        
+        if values_to_remove:
+            self._set_domain(h_i, a_i, self.domains[h_i][a_i] & ~values_to_remove)
+        return values_to_remove != 0
+    
+    def _backtrack(self, assignment: Assignment, discrepancies: Optional[int] = None) -> Iterator[Assignment]:
+        """
+        Depth-first search with backtracking, logging and forward checking.
+        Yields the live assignment at every solution; resuming continues the search from there.
+        When a subtree is exhausted without solutions, self.conflict holds the decision levels
+        responsible; with backjumping a dead end that does not involve this level's decision
+        is passed straight up.
+        discrepancies: how many more times the path may take a choice other than the first
+        one (None = no limit).
+        """
         if self._is_complete(assignment):
-            return assignment
+            self.solution_count += 1
+            yield assignment
+            return
+        
+        if self.restart_limit is not None and self.failed_attempts >= self.restart_limit:
+            self.restart_pending = True
+            return
+        
+        self._record_partial()
+        
+        if self.node_limit is not None and self.backtrack_count >= self.node_limit:
+            self.budget_status = 'node_limit'
+        if self._out_of_time():
+            return
         
         self.backtrack_count += 1
         self.search_effort += 1  # Count each search node explored
         
-        var = self._select_unassigned_variable(assignment)
-        if var is None:
-            return None
+        level = len(self.decision_stack) + 1
+        level_bit = 1 << level
+        earlier_levels = level_bit - 2  # Blames every earlier decision, i.e. chronological
         
-        houseNr, attr_key = var
+        if self.probing == 'node' and level > 1 and not self._probe(level):
+            return
         
-        # Order values by Least Constraining Value (LCV)
-        domain_values = list(self.domains[houseNr][attr_key])
-        if len(domain_values) > 1:
-            value_scores = []
-            for val in domain_values:
-                # Count how many values remain in neighboring variables if we choose this value
-                remaining_count = 0
-                for other_pos in range(1, self.num_House + 1):
-                    for other_attr in self.attributes.keys():
-                        if other_pos != houseNr or other_attr != attr_key:
-                            # Quick check: will this value eliminate options?
-                            remaining_count += len(self.domains[other_pos][other_attr])
-                
-                value_scores.append((remaining_count, val))
-            
-            # Sort by most remaining values (least constraining first)
-            value_scores.sort(reverse=True)
-            domain_values = [val for _, val in value_scores]
+        branching = self._get_branching_choices(assignment, level)
+        if branching is None:
+            return
+        choices, node_conflict, fixpoints = branching
+        solutions_before = self.solution_count
+        cutoffs_before = self.discrepancy_cutoffs
         
-        for value in domain_values:
+        for i, (h, a, v) in enumerate(choices):
+            child_discrepancies = discrepancies
+            if i and discrepancies is not None:
+                if not discrepancies:
+                    # Every further alternative is a discrepancy the limit no longer allows
+                    self.discrepancy_cutoffs += 1
+                    break
+                child_discrepancies = discrepancies - 1
+            
+            houseNr, attr_key, value = h + 1, self.attr_keys[a], self.attr_values[a][v]
             self.assignment_attempts += 1  # Count every assignment attempt
             
             current_features = self._get_feature_vector()
@@ -317,29 +1269,296 @@ class ConstraintSolver:
 
             self.search_trace.append(log_row)
 
-            new_assignment = copy.deepcopy(assignment)
-            if houseNr not in new_assignment:
-                new_assignment[houseNr] = {}
-            new_assignment[houseNr][attr_key] = value
+            # Assign the whole entity in place; undone below together with the trail.
+            # The position index rejects a value that is already used in another house.
+            e = self.entity_of[a][v]
+            placed = self._place_entity(assignment, h, e)
+            if placed is None:
+                node_conflict |= earlier_levels
+                continue
             
-            if self._is_consistent(new_assignment):
-                saved_domains = copy.deepcopy(self.domains)
-                
-                self.domains[houseNr][attr_key] = {value}
+            self.decision_stack.append((h, e))
+            self.decision_levels[(h, e)] = level
+            child_conflict = earlier_levels | level_bit
+            
+            if all(self._is_consistent_after(assignment, self.attr_keys[pa], self.attr_values[pa][pv])
+                   for pa, pv in placed):
+                mark = len(self.trail)
                 
-                if self._propagate():
-                    result = self._backtrack(new_assignment)
-                    if result is not None:
-                        return result
+                nogood = self._violated_nogood(h, e)
+                if nogood is not None:
+                    self.nogood_failures += 1
+                    child_conflict = nogood
+                elif self._make_decision(h, a, v, level_bit, fixpoints.get((h, a, v))):
+                    child_solutions = self.solution_count
+                    child_cutoffs = self.discrepancy_cutoffs
+                    yield from self._backtrack(assignment, child_discrepancies)
+                    if self.solution_count > child_solutions or self.discrepancy_cutoffs > child_cutoffs:
+                        # Not a (fully searched) dead end: it must neither be jumped over nor
+                        # learned as a nogood
+                        child_conflict = earlier_levels | level_bit
                     else:
-                        self.failed_attempts += 1  # Count when backtrack returns None (dead end)
+                        self.failed_attempts += 1  # Count when backtrack finds nothing (dead end)
+                        child_conflict = self.conflict
                 else:
                     self.failed_attempts += 1  # Count when propagate fails
+                    child_conflict = self.conflict
                 
-                self.domains = saved_domains
+                self._undo(mark)
+            
+            del self.decision_levels[(h, e)]
+            self.decision_stack.pop()
+            for pa, _ in placed:
+                assignment.unassign(houseNr, self.attr_keys[pa])
+            
+            # A restart or a spent budget unwinds the whole search; this node's conflict set is incomplete
+            if self.restart_pending or self.budget_status is not None:
+                return
+            
+            if self.backjumping and not child_conflict & level_bit:
+                # This decision played no part in the failure, so its siblings fail the same way
+                self.backjump_count += 1
+                self.conflict = child_conflict
+                return
+            node_conflict |= child_conflict & ~level_bit
+        
+        self.conflict = node_conflict
+        if self.solution_count == solutions_before and self.discrepancy_cutoffs == cutoffs_before:
+            self._learn_nogood(node_conflict)
+    
+    def _learn_nogood(self, conflict: int) -> None:
+        """Store the decisions of a conflict set as a nogood, evicting the oldest past the limit."""
+        if not self.nogood_limit or not conflict:
+            return
+        nogood = frozenset(self.decision_stack[level - 1] for level in _iter_bits(conflict))
+        self.nogoods.append(nogood)
+        for decision in nogood:
+            self.nogood_watches.setdefault(decision, []).append(nogood)
         
+        if len(self.nogoods) > self.nogood_limit:
+            for decision in self.nogoods.popleft():
+                self.nogood_watches[decision].pop(0)
+    
+    def _violated_nogood(self, h: int, e: int) -> Optional[int]:
+        """Levels of a stored nogood completed by deciding (h, e), or None if there is none."""
+        for nogood in self.nogood_watches.get((h, e), ()):
+            if all(decision in self.decision_levels for decision in nogood):
+                conflict = 0
+                for decision in nogood:
+                    conflict |= 1 << self.decision_levels[decision]
+                return conflict
         return None
     
+    def _place_entity(self, assignment: Assignment, h: int, e: int) -> Optional[List[Tuple[int, int]]]:
+        """
+        Assign every member of entity e to house h. Returns the (attr, value) members that were
+        newly placed, or None (with nothing left assigned) if a member cannot go there.
+        """
+        houseNr = h + 1
+        placed = []
+        for a, v in self.entity_members[e]:
+            attr_key, value = self.attr_keys[a], self.attr_values[a][v]
+            if assignment.position_index.get((attr_key, value)) == houseNr:
+                continue
+            if not self.domains[h][a] >> v & 1 or not assignment.assign(houseNr, attr_key, value):
+                for pa, _ in placed:
+                    assignment.unassign(houseNr, self.attr_keys[pa])
+                return None
+            placed.append((a, v))
+        return placed
+    
+    def _get_branching_choices(self, assignment: Assignment, level: int) -> Optional[Tuple[List[Tuple[int, int, int]], int, Dict[Tuple[int, int, int], list]]]:
+        """
+        The (house, attr, value) alternatives of the decision at depth `level`, in the order to
+        try them, the decision levels that ruled out the missing ones (0 without backjumping),
+        and the fixpoints the lookahead kept per alternative. None (with self.conflict set) if
+        the node turns out inconsistent.
+        """
+        if self.branching == 'value':
+            var = self._select_unassigned_value(assignment)
+            if var is None:
+                self.conflict = (1 << level) - 2
+                return None
+            a, v = var
+            e = self.entity_of[a][v]
+            choices = [(h, a, v) for h in _iter_bits(self._entity_positions(e))]
+        else:
+            var = self._select_unassigned_variable(assignment)
+            if var is None:
+                self.conflict = (1 << level) - 2
+                return None
+            h, a = var
+            choices = [(h, a, v) for v in self._order_values(h, a)]
+        
+        fixpoints = {}
+        if self.value_ordering == 'lookahead':
+            lookahead = self._order_by_lookahead(choices, level)
+            if lookahead is None:
+                return None
+            choices, fixpoints = lookahead
+        
+        # Alternatives already ruled out are explained by the decisions behind their pruning
+        reason = 0
+        if self.backjumping:
+            if self.branching == 'value':
+                for member in self.entity_members[e]:
+                    reason |= self._value_reason(*member)
+            else:
+                reason = self._cell_reason(h, a)
+        return choices, reason, fixpoints
+    
+    def _order_values(self, h: int, a: int) -> List[int]:
+        """Static value order: by value name, descending."""
+        domain_values = list(_iter_bits(self.domains[h][a]))
+        domain_values.sort(key=lambda v: (self.attr_values[a][v], v), reverse=True)
+        return domain_values
+    
+    def _order_by_lookahead(self, choices: List[Tuple[int, int, int]],
+                            level: int) -> Optional[Tuple[List[Tuple[int, int, int]], Dict[Tuple[int, int, int], list]]]:
+        """
+        Least Constraining Value (LCV): tentatively make each decision, propagate, and count
+        the values it prunes. Fewest pruned first; ties keep the incoming order. The fixpoint
+        each choice reaches is kept so _make_decision can replay it instead of propagating again.
+        A choice whose propagation fails is removed from the domains at this node (explained by
+        the failure's other reasons) and the fixpoint is restored; the kept fixpoints are stale
+        after that and dropped. None (with self.conflict set) if the node becomes inconsistent.
+        """
+        if len(choices) < 2:
+            return choices, {}
+        
+        level_bit = 1 << level
+        scores = []
+        fixpoints = {}
+        failed = []
+        for i, (h, a, v) in enumerate(choices):
+            mark = len(self.trail)
+            if self._try_decision(h, a, v, level_bit):
+                scores.append((self._count_pruned(mark), i))
+                fixpoints[(h, a, v)] = self._changed_cells(mark)
+            else:
+                failed.append((h, a, v, self.conflict & ~level_bit))
+            self._undo(mark)
+            if self.budget_status is not None:
+                # A failure caused by the spent budget proves nothing
+                self.conflict = level_bit - 2
+                return None
+        
+        if failed:
+            fixpoints = {}
+            for h, a, v, reason in failed:
+                self.active_reason = reason
+                self._set_domain(h, a, self.domains[h][a] & ~(1 << v))
+                self.domain_reductions += 1
+                if self.domains[h][a] == 0:
+                    self.conflict = self._cell_reason(h, a) if self.backjumping else level_bit - 2
+                    self._clear_queue()
+                    return None
+            if not self._propagate():
+                return None
+        
+        scores.sort()
+        ordered = [choices[i] for _, i in scores]
+        return [(h, a, v) for h, a, v in ordered if self.domains[h][a] >> v & 1], fixpoints
+    
+    def _changed_cells(self, mark: int) -> List[Tuple[int, int, int, Optional[List[int]]]]:
+        """(house, attr, mask, prune reasons) of every cell changed since the trail had length `mark`."""
+        cells = dict.fromkeys((h, a) for h, a, _ in self.trail[mark:])
+        if not self.backjumping:
+            return [(h, a, self.domains[h][a], None) for h, a in cells]
+        return [(h, a, self.domains[h][a], list(self.prune_reasons[h][a])) for h, a in cells]
+    
+    def _make_decision(self, h: int, a: int, v: int, level_bit: int, fixpoint: Optional[list]) -> bool:
+        """
+        Decide value v for house h and reach the fixpoint, either by replaying the cells the
+        lookahead recorded for this decision or by propagating; False (with self.conflict set)
+        on failure. The caller undoes the trail.
+        """
+        if fixpoint is None:
+            return self._try_decision(h, a, v, level_bit)
+        
+        self.active_reason = 0
+        for ch, ca, mask, reasons in fixpoint:
+            removed = self.domains[ch][ca] & ~mask
+            self._set_domain(ch, ca, mask)
+            if reasons is not None:
+                cell_reasons = self.prune_reasons[ch][ca]
+                for cv in _iter_bits(removed):
+                    cell_reasons[cv] = reasons[cv]
+        # The recorded cells are a fixpoint already
+        self._clear_queue()
+        return True
+    
+    def _try_decision(self, h: int, a: int, v: int, level_bit: int) -> bool:
+        """
+        Tentatively place the entity of value v in house h as the decision at level_bit and
+        propagate; False (with self.conflict set) on failure. The caller undoes the trail.
+        """
+        self.active_reason = level_bit
+        for pa, pv in self.entity_members[self.entity_of[a][v]]:
+            if not self.domains[h][pa] >> pv & 1:
+                self.conflict = level_bit | self._cell_reason(h, pa) if self.backjumping else level_bit
+                self._clear_queue()
+                return False
+            self._set_domain(h, pa, 1 << pv)
+        return self._propagate()
+    
+    def _probe(self, level: int) -> bool:
+        """
+        Failed-literal probing (singleton arc consistency) at decision depth `level`: try every
+        value of every open cell as if it were decided there, and remove it when propagation
+        fails. Repeats until a full pass removes nothing or the budget is spent; False (with
+        self.conflict set) if the domains become inconsistent.
+        """
+        level_bit = 1 << level
+        deadline = time.time() + self.probe_time if self.probe_time is not None else None
+        probes = 0
+        
+        changed = True
+        while changed:
+            changed = False
+            for h in range(self.num_House):
+                for a in self.sorted_attrs:
+                    domain = self.domains[h][a]
+                    if domain & (domain - 1) == 0:
+                        continue
+                    
+                    for v in _iter_bits(domain):
+                        if probes >= self.probe_limit or (deadline is not None and time.time() > deadline):
+                            return True
+                        if self._out_of_time():
+                            return False
+                        probes += 1
+                        self.probe_count += 1
+                        
+                        mark = len(self.trail)
+                        if self._try_decision(h, a, v, level_bit):
+                            self._undo(mark)
+                            continue
+                        self._undo(mark)
+                        if self.budget_status is not None:
+                            return False
+                        
+                        # The failure's other reasons imply that v cannot go in house h
+                        self.probe_removals += 1
+                        self.active_reason = self.conflict & ~level_bit
+                        self._set_domain(h, a, self.domains[h][a] & ~(1 << v))
+                        if self.domains[h][a] == 0:
+                            self.conflict = self._cell_reason(h, a) if self.backjumping else level_bit - 2
+                            self._clear_queue()
+                            return False
+                        if not self._propagate():
+                            return False
+                        changed = True
+        
+        return True
+    
+    def _count_pruned(self, mark: int) -> int:
+        """Number of (house, attr, value) candidates removed since the trail had length `mark`."""
+        first_masks = {}
+        for h, a, mask in self.trail[mark:]:
+            first_masks.setdefault((h, a), mask)
+        return sum(_popcount(mask & ~self.domains[h][a]) for (h, a), mask in first_masks.items())
+    
     def _is_complete(self, assignment: Dict[int, Dict[str, str]]) -> bool:
         """Check if all variables are assigned."""
         if len(assignment) != self.num_House:
@@ -353,92 +1572,148 @@ class ConstraintSolver:
         
         return True
     
-    def _is_consistent(self, assignment: Dict[int, Dict[str, str]]) -> bool:
-        """Check if assignment satisfies all-different and constraint checks."""
-        for attr_key in sorted(self.attributes.keys()):
-            used_values = []
-            for houseNr in range(1, self.num_House + 1):
-                if houseNr in assignment and attr_key in assignment[houseNr]:
-                    value = assignment[houseNr][attr_key]
-                    if value in used_values:
-                        return False
-                    used_values.append(value)
-        
-        for constraint in self.constraints:
+    def _is_consistent_after(self, assignment: Assignment, attr_key: str, value: str) -> bool:
+        """Re-check only the constraints watching the value that was just assigned."""
+        for constraint in self.value_watches.get((attr_key, value), ()):
+            if not constraint.is_valid(assignment):
+                return False
+        for constraint in self.key_watches.get(attr_key, ()):
+            if not constraint.is_valid(assignment):
+                return False
+        for constraint in self.unwatched_constraints:
             if not constraint.is_valid(assignment):
                 return False
-        
         return True
     
-    def _select_unassigned_variable(self, assignment: Dict[int, Dict[str, str]]) -> Optional[Tuple[int, str]]:
-        """Select unassigned variable with MRV + Degree heuristic."""
+    def _select_unassigned_variable(self, assignment: Dict[int, Dict[str, str]]) -> Optional[Tuple[int, int]]:
+        """Select unassigned variable (house index, attr index) with MRV + Degree heuristic."""
+        if self.heuristic == 'domwdeg':
+            return self._select_domwdeg_variable(assignment)
+        
         min_domain_size = float('inf')
         best_vars = []
         
-        for houseNr in range(1, self.num_House + 1):
-            for attr_key in sorted(self.attributes.keys()):
-                if houseNr in assignment and attr_key in assignment[houseNr]:
+        for h in range(self.num_House):
+            for a in self.sorted_attrs:
+                if h + 1 in assignment and self.attr_keys[a] in assignment[h + 1]:
                     continue
                 
-                domain_size = len(self.domains[houseNr][attr_key])
+                domain_size = _popcount(self.domains[h][a])
                 if domain_size == 0:
-                    return (houseNr, attr_key)
+                    return (h, a)
                 
                 if domain_size < min_domain_size:
                     min_domain_size = domain_size
-                    best_vars = [(houseNr, attr_key)]
+                    best_vars = [(h, a)]
                 elif domain_size == min_domain_size:
-                    best_vars.append((houseNr, attr_key))
+                    best_vars.append((h, a))
         
         # Degree heuristic: break ties by choosing variable with most constraints
         if len(best_vars) > 1:
             max_degree = -1
             best_var = best_vars[0]
-            for houseNr, attr_key in best_vars:
-                degree = self._count_constraints(houseNr, attr_key, assignment)
+            for h, a in best_vars:
+                degree = self._count_constraints(h, a, assignment)
                 if degree > max_degree:
                     max_degree = degree
-                    best_var = (houseNr, attr_key)
+                    best_var = (h, a)
             return best_var
         
         return best_vars[0] if best_vars else None
     
-    def _count_constraints(self, houseNr: int, attr_key: str, assignment: Dict[int, Dict[str, str]]) -> int:
-        """Count how many constraints involve this variable with unassigned variables."""
-        count = 0
-        for constraint in self.constraints:
-            if not hasattr(constraint, 'attr1') or not hasattr(constraint, 'attr2'):
-                continue
-            if not constraint.attr1 or not constraint.attr2:
+    def _select_domwdeg_variable(self, assignment: Dict[int, Dict[str, str]]) -> Optional[Tuple[int, int]]:
+        """
+        Select the unassigned (house index, attr index) with the smallest domain size / weighted
+        degree; a cell's weighted degree sums the weights of the propagators reading one of its
+        remaining values.
+        """
+        weights = self.propagator_weights
+        value_propagators = self.value_propagators
+        best_vars = []
+        best_score = None
+        
+        for h in range(self.num_House):
+            for a in self.sorted_attrs:
+                if h + 1 in assignment and self.attr_keys[a] in assignment[h + 1]:
+                    continue
+                
+                domain_size = _popcount(self.domains[h][a])
+                if domain_size == 0:
+                    return (h, a)
+                
+                pids = 0
+                for v in _iter_bits(self.domains[h][a]):
+                    pids |= value_propagators[a][v]
+                score = domain_size / sum(weights[pid] for pid in _iter_bits(pids))
+                if best_score is None or score < best_score:
+                    best_score = score
+                    best_vars = [(h, a)]
+                elif score == best_score:
+                    best_vars.append((h, a))
+        
+        return self._break_tie(best_vars)
+    
+    def _break_tie(self, candidates: list):
+        """First candidate, or a seeded random one when randomized tie-breaking is on."""
+        if not candidates:
+            return None
+        if self.random is not None:
+            return self.random.choice(candidates)
+        return candidates[0]
+    
+    def _select_unassigned_value(self, assignment: Assignment) -> Optional[Tuple[int, int]]:
+        """
+        Value-centric MRV: the unplaced entity with the fewest possible houses, ties by clue
+        count; with 'domwdeg', the fewest possible houses per unit of propagator weight.
+        """
+        domwdeg = self.heuristic == 'domwdeg'
+        best_vars = []
+        best_score = None
+        
+        for e, members in enumerate(self.entity_members):
+            if all((self.attr_keys[a], self.attr_values[a][v]) in assignment.position_index
+                   for a, v in members):
                 continue
             
-            _, attr1_key = constraint.attr1
-            _, attr2_key = constraint.attr2
+            position_count = _popcount(self._entity_positions(e))
+            if position_count == 0:
+                return members[0]
             
+            if domwdeg:
+                score = position_count / sum(self.propagator_weights[pid] for pid in self.entity_propagators[e])
+            else:
+                score = (position_count, -self.entity_degrees[e])
+            if best_score is None or score < best_score:
+                best_score = score
+                best_vars = [members[0]]
+            elif domwdeg and score == best_score:
+                best_vars.append(members[0])
+        
+        return self._break_tie(best_vars)
+    
+    def _count_constraints(self, h: int, a: int, assignment: Dict[int, Dict[str, str]]) -> int:
+        """Count how many constraints involve this variable with unassigned variables."""
+        count = 0
+        for _, a1, _, a2, _ in self.binary_constraints:
             # Check if this variable is involved
-            if attr_key in (attr1_key, attr2_key):
+            if a in (a1, a2):
                 # Count if the other variable is unassigned
+                other_key = self.attr_keys[a1 if a == a2 else a2]
                 for other_pos in range(1, self.num_House + 1):
-                    other_attr = attr1_key if attr_key == attr2_key else attr2_key
-                    if other_pos not in assignment or other_attr not in assignment.get(other_pos, {}):
+                    if other_pos not in assignment or other_key not in assignment.get(other_pos, {}):
                         count += 1
         return count
     
-    def _build_partial_solution(self) -> Dict[int, Dict[str, str]]:
-        """Extract determined values from domains to form partial solution."""
-        solution = copy.deepcopy(self.assignment)
-        
-        for houseNr in range(1, self.num_House + 1):
-            if houseNr not in solution:
-                solution[houseNr] = {}
-            
-            for attr_key in self.attributes.keys():
-                if len(self.domains[houseNr][attr_key]) == 1:
-                    value = list(self.domains[houseNr][attr_key])[0]
-                    if attr_key not in solution[houseNr]:
-                        solution[houseNr][attr_key] = value
-        
-        return solution
+    def get_stats(self) -> Dict[str, object]:
+        """Outcome of the last solve: status, most complete assignment and effort counters."""
+        stats = {
+            'status': self.status,
+            'best_partial': self.best_partial,
+            'elapsed': time.time() - self.start_time,
+        }
+        for counter in EFFORT_COUNTERS:
+            stats[counter] = getattr(self, counter)
+        return stats
     
     def print_solution(self, solution: Dict[int, Dict[str, str]]) -> None:
         if solution is None:
@@ -454,10 +1729,11 @@ class ConstraintSolver:
     def print_domains(self) -> None:
         """Print current domain state for debugging."""
         print("\n=== Current Domains ===")
-        for pos in sorted(self.domains.keys()):
-            print(f"\nPosition {pos}:")
-            for attr_key, values in sorted(self.domains[pos].items()):
-                print(f"  {attr_key}: {values}")
+        for h in range(self.num_House):
+            print(f"\nPosition {h + 1}:")
+            for a in self.sorted_attrs:
+                values = {self.attr_values[a][v] for v in _iter_bits(self.domains[h][a])}
+                print(f"  {self.attr_keys[a]}: {values}")
 
     def _get_feature_vector(self) -> List[int]:
         """
@@ -468,15 +1744,10 @@ class ConstraintSolver:
                        sorted by house number and attribute name to ensure consistency.
         """
         features = []
-        sorted_attrs = sorted(self.attributes.keys())
 
-        for house in range(1, self.num_House + 1):
-            for attr in sorted_attrs:
-                if house in self.domains and attr in self.domains[house]:
-                    size = len(self.domains[house][attr])
-                else:
-                    size = 0
-                features.append(size)
+        for h in range(self.num_House):
+            for a in self.sorted_attrs:
+                features.append(_popcount(self.domains[h][a]))
 
         return features
 
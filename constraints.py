@@ -111,12 +111,112 @@ class Constraint():
     def get_wrong_attributes(self, attributes):
         raise NotImplementedError()
     
+    def get_scope(self):
+        """Return the (value, attr_key) pairs whose positions this constraint relates."""
+        raise NotImplementedError()
+    
+    def filter_positions(self, positions, num_House):
+        """
+        Narrow the possible positions of the values in get_scope().
+
+        positions[i] is a bitmask of the houses the i-th scope value can still occupy
+        (bit h - 1 set = house h). Returns the narrowed masks, or None if the
+        constraint can never hold.
+        """
+        raise NotImplementedError()
+    
+    def get_identity_pair(self):
+        """Return the two (value, attr_key) pairs this clue puts in the same house, None if it is no identity."""
+        return None
+    
+    def allowed_positions(self, num_House):
+        """Bitmask of the houses a single-value clue leaves its value (0 if none)."""
+        narrowed = self.filter_positions([(1 << num_House) - 1], num_House)
+        return narrowed[0] if narrowed is not None else 0
+    
+    def relation(self, num_House, reverse=False):
+        """
+        Support table of a two-value clue: relation[h] is the bitmask of houses the second
+        value can occupy while the first sits in house h + 1 (with reverse, the houses of
+        the first value for the second in house h + 1).
+        """
+        full_house_mask = (1 << num_House) - 1
+        relation = []
+        for h in range(num_House):
+            if reverse:
+                narrowed = self.filter_positions([full_house_mask, 1 << h], num_House)
+                relation.append(narrowed[0] if narrowed is not None and narrowed[1] else 0)
+            else:
+                narrowed = self.filter_positions([1 << h, full_house_mask], num_House)
+                relation.append(narrowed[1] if narrowed is not None and narrowed[0] else 0)
+        return relation
+    
+    def _get_binary_scope(self):
+        if not self.attr1 or not self.attr2:
+            return []
+        return [self.attr1, self.attr2]
+    
+    def _house_mask(self, houseNr, num_House):
+        """Bitmask of a single house, 0 if the house number is outside the row."""
+        if houseNr is None or not 1 <= houseNr <= num_House:
+            return 0
+        return 1 << (houseNr - 1)
+    
+    def _shift_positions(self, mask, offset, num_House):
+        """Move every house in mask by offset, dropping houses that fall off the row."""
+        if offset >= 0:
+            return (mask << offset) & ((1 << num_House) - 1)
+        return mask >> -offset
+    
     def _get_position_by_attribute(self, attr_value, attr_key, currentSolution):
+        # The solver's Assignment keeps an inverse (attr_key, value) -> house index
+        position_index = getattr(currentSolution, 'position_index', None)
+        if position_index is not None:
+            return position_index.get((attr_key, attr_value))
+        
         for pos, attrs in currentSolution.items():
             if attrs.get(attr_key) == attr_value:
                 return pos
         return None
     
+class ValueIndex():
+    """
+    Interned attributes of a puzzle, shared by the solving engines: attribute a is
+    attr_keys[a] and value v of it is attr_values[a][v] (list order, duplicates dropped).
+    """
+
+    def __init__(self, attributes: dict):
+        self.attr_keys = list(attributes.keys())
+        self.attr_index = {attr_key: a for a, attr_key in enumerate(self.attr_keys)}
+        self.attr_values = [list(dict.fromkeys(attributes[attr_key])) for attr_key in self.attr_keys]
+        self.value_index = [{value: v for v, value in enumerate(values)} for values in self.attr_values]
+
+    def intern(self, attr):
+        """Map a (value, attr_key) pair from a constraint to (attr index, value index), None if unknown."""
+        value, attr_key = attr
+        a = self.attr_index.get(attr_key)
+        if a is None or value not in self.value_index[a]:
+            return None
+        return a, self.value_index[a][value]
+
+    def clues(self, constraints):
+        """
+        Yield (constraint, interned scope) for every clue an engine has to enforce.
+        A clue without a parsed scope holds everywhere or nowhere, so it is only yielded
+        (with an empty scope) when is_valid rejects it. A clue about a value outside the
+        attribute lists is skipped: that value never gets a position, so is_valid accepts it.
+        """
+        for constraint in constraints:
+            scope = constraint.get_scope()
+            if not scope:
+                if not constraint.is_valid({}):
+                    yield constraint, []
+                continue
+            interned = [self.intern(attr) for attr in scope]
+            if None not in interned:
+                yield constraint, interned
+
+
 class IdentityConstrain(Constraint):
 
     def get_info(self):
@@ -124,7 +224,7 @@ class IdentityConstrain(Constraint):
 
     def is_valid(self, currentSolution):
         # Handle "house X is painted Y" pattern (position-based identity)
-        if hasattr(self, 'house_num') and self.attr2:
+        if self.house_num is not None and self.attr2:
             attr2_val, attr2_key = self.attr2
             # Check if position house_num has attr2_key = attr2_val
             if self.house_num in currentSolution:
@@ -164,6 +264,26 @@ class IdentityConstrain(Constraint):
         
         return []
 
+    def get_scope(self):
+        if self.house_num is not None and self.attr2:
+            return [self.attr2]
+        return self._get_binary_scope()
+    
+    def get_identity_pair(self):
+        if self.house_num is None and self.attr1 and self.attr2:
+            return (self.attr1, self.attr2)
+        return None
+    
+    def filter_positions(self, positions, num_House):
+        if self.house_num is not None and self.attr2:
+            return [positions[0] & self._house_mask(self.house_num, num_House)]
+        if not self.attr1 or not self.attr2:
+            return None
+        
+        # Both values live in the same house
+        shared = positions[0] & positions[1]
+        return [shared, shared]
+
     def _parse_attributes(self):
         clue_lower = self.clue.lower()
         
@@ -388,6 +508,18 @@ class NextToConstrain(Constraint):
         
         return []
 
+    def get_scope(self):
+        return self._get_binary_scope()
+    
+    def filter_positions(self, positions, num_House):
+        if not self.attr1 or not self.attr2:
+            return None
+        
+        pos1, pos2 = positions
+        pos1 &= self._shift_positions(pos2, 1, num_House) | self._shift_positions(pos2, -1, num_House)
+        pos2 &= self._shift_positions(pos1, 1, num_House) | self._shift_positions(pos1, -1, num_House)
+        return [pos1, pos2]
+
     def _parse_attributes(self):
         parts = self.clue.split(" and ")
         
@@ -453,6 +585,19 @@ class DistanceConstrain(Constraint):
         
         return []
     
+    def get_scope(self):
+        return self._get_binary_scope()
+    
+    def filter_positions(self, positions, num_House):
+        if not self.attr1 or not self.attr2:
+            return None
+        
+        offset = self.distance + 1
+        pos1, pos2 = positions
+        pos1 &= self._shift_positions(pos2, offset, num_House) | self._shift_positions(pos2, -offset, num_House)
+        pos2 &= self._shift_positions(pos1, offset, num_House) | self._shift_positions(pos1, -offset, num_House)
+        return [pos1, pos2]
+
     def _parse_attributes(self):
         distance_words = {
             "one": 1,
@@ -551,6 +696,23 @@ class LeftConstrain(Constraint):
         
         return []
     
+    def get_scope(self):
+        return self._get_binary_scope()
+    
+    def filter_positions(self, positions, num_House):
+        if not self.attr1 or not self.attr2:
+            return None
+        
+        pos1, pos2 = positions
+        if not pos1 or not pos2:
+            return [0, 0]
+        # attr1 must be left of the rightmost option of attr2, attr2 right of the leftmost of attr1
+        pos1 &= (1 << (pos2.bit_length() - 1)) - 1
+        if not pos1:
+            return [0, pos2]
+        pos2 &= ~(((pos1 & -pos1) << 1) - 1)
+        return [pos1, pos2]
+
     def _parse_attributes(self):
         if " is somewhere to the left of " in self.clue:
             parts = self.clue.split(" is somewhere to the left of ")
@@ -620,6 +782,23 @@ class RightConstrain(Constraint):
         
         return []
     
+    def get_scope(self):
+        return self._get_binary_scope()
+    
+    def filter_positions(self, positions, num_House):
+        if not self.attr1 or not self.attr2:
+            return None
+        
+        pos1, pos2 = positions
+        if not pos1 or not pos2:
+            return [0, 0]
+        # attr2 must be left of the rightmost option of attr1, attr1 right of the leftmost of attr2
+        pos2 &= (1 << (pos1.bit_length() - 1)) - 1
+        if not pos2:
+            return [pos1, 0]
+        pos1 &= ~(((pos2 & -pos2) << 1) - 1)
+        return [pos1, pos2]
+
     def _parse_attributes(self):
         if " is somewhere to the right of " in self.clue:
             parts = self.clue.split(" is somewhere to the right of ")
@@ -691,6 +870,18 @@ class DirectLeftConstrain(Constraint):
         
         return []
     
+    def get_scope(self):
+        return self._get_binary_scope()
+    
+    def filter_positions(self, positions, num_House):
+        if not self.attr1 or not self.attr2:
+            return None
+        
+        pos1, pos2 = positions
+        pos1 &= self._shift_positions(pos2, -1, num_House)
+        pos2 &= self._shift_positions(pos1, 1, num_House)
+        return [pos1, pos2]
+
     def _parse_attributes(self):
         # Try multiple split patterns for "left of"
         parts = None
@@ -770,6 +961,18 @@ class DirectRightConstrain(Constraint):
         
         return []
     
+    def get_scope(self):
+        return self._get_binary_scope()
+    
+    def filter_positions(self, positions, num_House):
+        if not self.attr1 or not self.attr2:
+            return None
+        
+        pos1, pos2 = positions
+        pos1 &= self._shift_positions(pos2, 1, num_House)
+        pos2 &= self._shift_positions(pos1, -1, num_House)
+        return [pos1, pos2]
+
     def _parse_attributes(self):
         # Try multiple split patterns for "right of"
         parts = None
@@ -856,6 +1059,28 @@ class PositionAbsoluteConstrain(Constraint):
         
         return []
     
+    def get_scope(self):
+        if hasattr(self, 'pos_attr') and self.attr1:
+            return [self.attr1, self.pos_attr]
+        if not self.attr1 or self.pos is None:
+            return []
+        return [self.attr1]
+    
+    def get_identity_pair(self):
+        if hasattr(self, 'pos_attr') and self.attr1:
+            return (self.attr1, self.pos_attr)
+        return None
+    
+    def filter_positions(self, positions, num_House):
+        if hasattr(self, 'pos_attr') and self.attr1:
+            shared = positions[0] & positions[1]
+            return [shared, shared]
+        
+        if not self.attr1 or self.pos is None:
+            return None
+        
+        return [positions[0] & self._house_mask(self.pos, num_House)]
+
     def _parse_attributes(self):
         position_words = {
             "first": 1,
@@ -979,6 +1204,28 @@ class PositionAbsoluteNegativeConstrain(Constraint):
         
         return []
     
+    def get_scope(self):
+        if hasattr(self, 'pos_attr') and self.attr1:
+            return [self.attr1, self.pos_attr]
+        if not self.attr1 or self.pos is None:
+            return []
+        return [self.attr1]
+    
+    def filter_positions(self, positions, num_House):
+        if hasattr(self, 'pos_attr') and self.attr1:
+            pos1, pos2 = positions
+            # Only a fixed position of one side rules anything out for the other
+            if pos2 and pos2 & (pos2 - 1) == 0:
+                pos1 &= ~pos2
+            if pos1 and pos1 & (pos1 - 1) == 0:
+                pos2 &= ~pos1
+            return [pos1, pos2]
+        
+        if not self.attr1 or self.pos is None:
+            return None
+        
+        return [positions[0] & ~self._house_mask(self.pos, num_House)]
+
     def _parse_attributes(self):
         position_words = {
             "first": 1,
@@ -1036,4 +1283,18 @@ class PositionAbsoluteNegativeConstrain(Constraint):
         super().__init__(attributes, clue)
         self.attr1:tuple = None
         self.pos = None
-        self._parse_attributes()
\ No newline at end of file
+        self._parse_attributes()
+
+class SymmetryOrderConstrain(LeftConstrain):
+    """
+    Internal ordering clue added by the solver, not parsed from text: attr1 is somewhere to
+    the left of attr2. Used to break the symmetry between interchangeable values.
+    """
+
+    def get_info(self):
+        return f"SymmetryOrderConstrain: {self.clue}\nattr1:{self.attr1}\nattr2:{self.attr2}\n"
+
+    def __init__(self, attributes: dict, attr1: tuple, attr2: tuple):
+        super(LeftConstrain, self).__init__(attributes, f"{attr1[0]} is somewhere to the left of {attr2[0]}")
+        self.attr1:tuple = attr1
+        self.attr2:tuple = attr2
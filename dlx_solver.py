@@ -0,0 +1,343 @@
+import time
+from typing import Dict, Iterator, List, Optional
+from constraints import Constraint, ValueIndex
+
+
+class DLXSolver:
+    """
+    Dancing Links (Algorithm X) engine: every attribute is a permutation of its values over
+    the houses, so the grid is an exact cover problem.
+
+    Columns: one per cell (house, attribute) and one per placement (attribute, value); a
+    placement column is secondary (covered at most once) when the attribute has more values
+    than houses. Rows: one option (house, attribute, value) covering its cell and placement.
+    Options a unary clue rules out are never created.
+
+    Clues are checked as options are chosen: placing a value hides the options of every
+    clue partner that its filter_positions no longer allows (forward checking inside the
+    links, undone in reverse order like cover/uncover), and a partner already placed must
+    sit in an allowed house. Clues with wider scopes are re-checked with is_valid.
+
+    The effort counters carry the same names and meaning as in ConstraintSolver: a search
+    node per column chosen, an assignment attempt per option tried, a failed attempt per
+    option whose subtree holds no solution. time_limit / node_limit, status and
+    best_partial work the same way as well.
+    """
+
+    def __init__(self, attributes: Dict[str, List[str]], constraints: List[Constraint],
+                 time_limit: Optional[float] = None, node_limit: Optional[int] = None):
+        self.attributes = attributes
+        self.constraints = constraints
+        self.num_House = len(next(iter(attributes.values())))
+        self.full_house_mask = (1 << self.num_House) - 1
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.deadline = None
+        self.budget_status = None
+        self.status = None
+        self.best_partial = {}
+
+        self.index = ValueIndex(attributes)
+        self.attr_keys = self.index.attr_keys
+        self.attr_values = self.index.attr_values
+
+        # Clue structure per (attr, value): allowed houses, binary partners, wider clues
+        self.infeasible = False  # A clue without a parsed scope that can never hold
+        self.allowed = {}
+        self.partners = {}
+        self.wide_watches = {}
+        self._build_clues()
+
+        self._build_links()
+        self.placed = {}  # (attr, value) -> house index of the chosen options
+        self.grid = {}  # houseNr -> {attr_key: value}, what is_valid of the wider clues reads
+
+        self.backtrack_count = 0
+        self.propagation_calls = 0
+        self.assignment_attempts = 0  # Track every option tried
+        self.domain_reductions = 0  # Track every option hidden by a clue
+        self.failed_attempts = 0  # Track options whose subtree holds no solution
+        self.search_effort = 0  # Track minimal realistic effort metric
+        self.solution_count = 0
+        self.start_time = time.time()
+
+    def _build_clues(self) -> None:
+        """
+        Unary clues narrow self.allowed. A binary clue gives each side a partner entry
+        (other value, allowed houses of the other value for every house of this one).
+        """
+        for constraint, interned in self.index.clues(self.constraints):
+            if not interned:
+                self.infeasible = True
+            elif len(interned) == 1:
+                allowed = constraint.allowed_positions(self.num_House)
+                self.allowed[interned[0]] = self.allowed.get(interned[0], self.full_house_mask) & allowed
+            elif len(interned) == 2:
+                first, second = interned
+                forward = constraint.relation(self.num_House)
+                backward = constraint.relation(self.num_House, reverse=True)
+
+                if first == second:
+                    # Both sides are the same value: only houses compatible with themselves remain
+                    allowed = sum(1 << h for h in range(self.num_House) if forward[h] >> h & 1)
+                    self.allowed[first] = self.allowed.get(first, self.full_house_mask) & allowed
+                    continue
+                self.partners.setdefault(first, []).append((second, forward))
+                self.partners.setdefault(second, []).append((first, backward))
+            else:
+                for node in dict.fromkeys(interned):
+                    self.wide_watches.setdefault(node, []).append(constraint)
+
+    def _build_links(self) -> None:
+        """
+        The sparse matrix as parallel lists: left/right/up/down links, column of every node,
+        column sizes. Node 0 is the root, nodes 1..columns the column headers.
+        """
+        num_houses = self.num_House
+        cell_column = {}
+        place_column = {}
+        primary = []
+        num_columns = 0
+        for a, values in enumerate(self.attr_values):
+            for h in range(num_houses):
+                num_columns += 1
+                cell_column[(h, a)] = num_columns
+                primary.append(num_columns)
+            for v in range(len(values)):
+                num_columns += 1
+                place_column[(a, v)] = num_columns
+                if len(values) == num_houses:
+                    primary.append(num_columns)
+
+        size = num_columns + 1
+        self.left = list(range(size))
+        self.right = list(range(size))
+        self.up = list(range(size))
+        self.down = list(range(size))
+        self.column = list(range(size))
+        self.sizes = [0] * size
+        self.covered = [False] * size
+
+        # Only primary columns are linked into the header list
+        previous = 0
+        for c in primary:
+            self.right[previous], self.left[c] = c, previous
+            previous = c
+        self.right[previous], self.left[0] = 0, previous
+
+        self.rows = []  # (house, attr, value) of every option
+        self.row_nodes = []
+        self.row_of = [-1] * size
+        self.option_of = {}
+        for a, values in enumerate(self.attr_values):
+            for v in range(len(values)):
+                allowed = self.allowed.get((a, v), self.full_house_mask)
+                for h in range(num_houses):
+                    if not allowed >> h & 1:
+                        continue
+                    r = len(self.rows)
+                    self.rows.append((h, a, v))
+                    self.option_of[(h, a, v)] = r
+                    nodes = []
+                    for c in (cell_column[(h, a)], place_column[(a, v)]):
+                        node = len(self.column)
+                        self.column.append(c)
+                        self.row_of.append(r)
+                        self.up.append(self.up[c])
+                        self.down.append(c)
+                        self.down[self.up[c]] = node
+                        self.up[c] = node
+                        self.sizes[c] += 1
+                        nodes.append(node)
+                    self.left.extend([nodes[1], nodes[0]])
+                    self.right.extend([nodes[1], nodes[0]])
+                    self.row_nodes.append(nodes)
+        self.hidden = [False] * len(self.rows)
+
+    def _cover(self, c: int) -> None:
+        """Remove column c from the header list and every row of c from the other columns."""
+        self.covered[c] = True
+        self.right[self.left[c]] = self.right[c]
+        self.left[self.right[c]] = self.left[c]
+        i = self.down[c]
+        while i != c:
+            j = self.right[i]
+            while j != i:
+                self.up[self.down[j]] = self.up[j]
+                self.down[self.up[j]] = self.down[j]
+                self.sizes[self.column[j]] -= 1
+                j = self.right[j]
+            i = self.down[i]
+
+    def _uncover(self, c: int) -> None:
+        """Exact inverse of _cover."""
+        i = self.up[c]
+        while i != c:
+            j = self.left[i]
+            while j != i:
+                self.sizes[self.column[j]] += 1
+                self.up[self.down[j]] = j
+                self.down[self.up[j]] = j
+                j = self.left[j]
+            i = self.up[i]
+        self.right[self.left[c]] = c
+        self.left[self.right[c]] = c
+        self.covered[c] = False
+
+    def _hide_row(self, r: int) -> bool:
+        """
+        Unlink an option that a clue rules out from its columns. Options of a covered
+        column are already out of the matrix and stay as they are. Returns whether it hid.
+        """
+        nodes = self.row_nodes[r]
+        if self.hidden[r] or any(self.covered[self.column[node]] for node in nodes):
+            return False
+        for node in nodes:
+            self.up[self.down[node]] = self.up[node]
+            self.down[self.up[node]] = self.down[node]
+            self.sizes[self.column[node]] -= 1
+        self.hidden[r] = True
+        return True
+
+    def _unhide_row(self, r: int) -> None:
+        for node in reversed(self.row_nodes[r]):
+            self.sizes[self.column[node]] += 1
+            self.up[self.down[node]] = node
+            self.down[self.up[node]] = node
+        self.hidden[r] = False
+
+    def _check_and_prune(self, h: int, a: int, v: int, hidden: List[int]) -> bool:
+        """
+        Clue check for placing value v of attribute a in house h: placed partners must sit
+        in an allowed house, options of the others outside it are hidden (appended to
+        `hidden` so they can be restored). False if some clue fails.
+        """
+        self.propagation_calls += 1
+        for (pa, pv), masks in self.partners.get((a, v), ()):
+            allowed = masks[h]
+            placed = self.placed.get((pa, pv))
+            if placed is not None:
+                if not allowed >> placed & 1:
+                    return False
+                continue
+            for ph in range(self.num_House):
+                if allowed >> ph & 1:
+                    continue
+                r = self.option_of.get((ph, pa, pv))
+                if r is not None and self._hide_row(r):
+                    hidden.append(r)
+                    self.domain_reductions += 1
+        for constraint in self.wide_watches.get((a, v), ()):
+            if not constraint.is_valid(self.grid):
+                return False
+        return True
+
+    def _choose_column(self) -> int:
+        """Primary column with the fewest options left (Knuth's S heuristic); 0 if all are covered."""
+        best, best_size = 0, None
+        c = self.right[0]
+        while c != 0:
+            if best_size is None or self.sizes[c] < best_size:
+                best, best_size = c, self.sizes[c]
+                if best_size <= 1:
+                    break
+            c = self.right[c]
+        return best
+
+    def _record_partial(self) -> None:
+        """Keep the most complete grid seen, for when a budget runs out."""
+        if len(self.placed) > sum(len(values) for values in self.best_partial.values()):
+            self.best_partial = {houseNr: dict(values) for houseNr, values in self.grid.items()}
+
+    def _out_of_budget(self) -> bool:
+        if self.budget_status is None:
+            if self.node_limit is not None and self.backtrack_count >= self.node_limit:
+                self.budget_status = 'node_limit'
+            elif self.deadline is not None and time.time() > self.deadline:
+                self.budget_status = 'timeout'
+        return self.budget_status is not None
+
+    def _search(self) -> Iterator[Dict[int, Dict[str, str]]]:
+        """Algorithm X; yields the live grid at every solution."""
+        c = self._choose_column()
+        if c == 0:
+            self.solution_count += 1
+            yield self.grid
+            return
+
+        self._record_partial()
+        if self._out_of_budget():
+            return
+        self.backtrack_count += 1
+        self.search_effort += 1  # Count each search node explored
+
+        self._cover(c)
+        r_node = self.down[c]
+        while r_node != c:
+            h, a, v = self.rows[self.row_of[r_node]]
+            attr_key, value = self.attr_keys[a], self.attr_values[a][v]
+            self.assignment_attempts += 1  # Count every option tried
+
+            j = self.right[r_node]
+            while j != r_node:
+                self._cover(self.column[j])
+                j = self.right[j]
+            self.placed[(a, v)] = h
+            self.grid.setdefault(h + 1, {})[attr_key] = value
+
+            hidden = []
+            solutions = self.solution_count
+            if self._check_and_prune(h, a, v, hidden):
+                yield from self._search()
+            if self.solution_count == solutions:
+                self.failed_attempts += 1  # Count options that led to a dead end
+
+            for r in reversed(hidden):
+                self._unhide_row(r)
+            del self.grid[h + 1][attr_key]
+            if not self.grid[h + 1]:
+                del self.grid[h + 1]
+            del self.placed[(a, v)]
+            j = self.left[r_node]
+            while j != r_node:
+                self._uncover(self.column[j])
+                j = self.left[j]
+
+            if self.budget_status is not None:
+                break
+            r_node = self.down[r_node]
+        self._uncover(c)
+
+    def solve(self) -> Optional[Dict[int, Dict[str, str]]]:
+        """Search for the first exact cover that every clue accepts."""
+        self.start_time = time.time()
+        if self.time_limit is not None:
+            self.deadline = self.start_time + self.time_limit
+
+        result = None
+        if not self.infeasible:
+            found = next(self._search(), None)
+            if found is not None:
+                result = {houseNr: dict(values) for houseNr, values in found.items()}
+
+        if result is not None:
+            self.status = 'solved'
+            self.best_partial = result
+        else:
+            self.status = self.budget_status or 'unsat'
+        return result
+
+    def get_stats(self) -> Dict[str, object]:
+        """Outcome of the last solve: status, most complete assignment and effort counters."""
+        return {
+            'status': self.status,
+            'best_partial': self.best_partial,
+            'elapsed': time.time() - self.start_time,
+            'backtrack_count': self.backtrack_count,
+            'propagation_calls': self.propagation_calls,
+            'assignment_attempts': self.assignment_attempts,
+            'domain_reductions': self.domain_reductions,
+            'failed_attempts': self.failed_attempts,
+            'search_effort': self.search_effort,
+            'solution_count': self.solution_count,
+        }
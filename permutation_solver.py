@@ -0,0 +1,181 @@
+import itertools
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+from constraints import Constraint, ValueIndex
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it this engine is unavailable
+    np = None
+
+# Largest grids handed to the engine automatically: (4!)^4 candidates at most
+MAX_HOUSES = 4
+MAX_ATTRIBUTES = 4
+
+
+def can_enumerate(attributes: Dict[str, List[str]]) -> bool:
+    """Whether the puzzle is small enough for PermutationSolver (and NumPy is installed)."""
+    if np is None:
+        return False
+    num_House = len(next(iter(attributes.values())))
+    return (num_House <= MAX_HOUSES and len(attributes) <= MAX_ATTRIBUTES
+            and all(len(dict.fromkeys(values)) == num_House for values in attributes.values()))
+
+
+class PermutationSolver:
+    """
+    Zero-search engine for small grids: every attribute is one of the n! permutations of its
+    values, so all candidate grids can be enumerated and filtered with NumPy.
+
+    perms[p, v] is the house of value v under permutation p. Unary clues and clues inside
+    one attribute filter that attribute's permutations first. The surviving candidates are
+    then built attribute by attribute (most constrained first), and every binary clue is
+    applied as a vectorized mask as soon as both of its attributes are in, so dead
+    combinations are dropped before the next product. A clue's relation comes from its
+    filter_positions as an n x n boolean table (house of one value, house of the other).
+
+    All solutions are found at once, which makes it an exact reference for cross-checking
+    the search engines. Every attribute must have exactly one value per house.
+    """
+
+    def __init__(self, attributes: Dict[str, List[str]], constraints: List[Constraint]):
+        if np is None:
+            raise ImportError("PermutationSolver needs NumPy")
+        self.attributes = attributes
+        self.constraints = constraints
+        self.num_House = len(next(iter(attributes.values())))
+        self.status = None
+        self.best_partial = {}
+
+        self.index = ValueIndex(attributes)
+        self.attr_keys = self.index.attr_keys
+        self.attr_values = self.index.attr_values
+        if any(len(values) != self.num_House for values in self.attr_values):
+            raise ValueError("PermutationSolver needs exactly one value per house for every attribute")
+
+        permutations = list(itertools.permutations(range(self.num_House)))
+        self.perms = np.array(permutations, dtype=np.int8).reshape(-1, self.num_House)
+        self.candidates_checked = 0  # Track every candidate (partial) grid a mask was applied to
+        self.solution_count = 0
+        self.solutions = None  # Rows of permutation indices, one column per attribute
+        self.start_time = time.time()
+
+    def _relation(self, constraint: Constraint) -> 'np.ndarray':
+        """relation[h1, h2]: the clue holds with its first value in house h1 and its second in h2."""
+        supports = np.array(constraint.relation(self.num_House), dtype=np.int64)
+        return (supports[:, None] >> np.arange(self.num_House) & 1).astype(bool)
+
+    def _build_filters(self) -> Optional[Tuple[List['np.ndarray'], List[tuple], List[Constraint]]]:
+        """
+        Permutations each attribute keeps, binary clues across attributes as
+        (attr1, value1, attr2, value2, relation), and clues with wider scopes.
+        None if a clue without a parsed scope can never hold.
+        """
+        keep = [np.ones(len(self.perms), dtype=bool) for _ in self.attr_keys]
+        cross = []
+        wide = []
+        for constraint, interned in self.index.clues(self.constraints):
+            if not interned:
+                return None
+            if len(interned) == 1:
+                (a, v), = interned
+                allowed = constraint.allowed_positions(self.num_House)
+                houses = np.array([bool(allowed >> h & 1) for h in range(self.num_House)])
+                keep[a] &= houses[self.perms[:, v]]
+            elif len(interned) == 2:
+                (a1, v1), (a2, v2) = interned
+                relation = self._relation(constraint)
+                if a1 == a2:
+                    keep[a1] &= relation[self.perms[:, v1], self.perms[:, v2]]
+                else:
+                    cross.append((a1, v1, a2, v2, relation))
+            else:
+                wide.append(constraint)
+        return keep, cross, wide
+
+    def _attribute_order(self, keep: List['np.ndarray'], cross: List[tuple]) -> List[int]:
+        """Fewest permutations first, then always the attribute most tied to the ones already in."""
+        sizes = [int(mask.sum()) for mask in keep]
+        order = []
+        remaining = set(range(len(self.attr_keys)))
+        while remaining:
+            def links(a):
+                return sum(1 for a1, _, a2, _, _ in cross
+                           if (a1 == a and a2 in order) or (a2 == a and a1 in order))
+            best = min(remaining, key=lambda a: (-links(a), sizes[a], a))
+            order.append(best)
+            remaining.remove(best)
+        return order
+
+    def _enumerate(self) -> 'np.ndarray':
+        """All solutions as rows of permutation indices (column a = attribute a)."""
+        num_attrs = len(self.attr_keys)
+        filters = self._build_filters()
+        if filters is None:
+            return np.zeros((0, num_attrs), dtype=np.int64)
+        keep, cross, wide = filters
+        order = self._attribute_order(keep, cross)
+
+        rows = np.zeros((1, num_attrs), dtype=np.int64)
+        done = set()
+        for a in order:
+            options = np.flatnonzero(keep[a])
+            rows = np.repeat(rows, len(options), axis=0)
+            rows[:, a] = np.tile(options, len(rows) // max(len(options), 1))
+            done.add(a)
+            for a1, v1, a2, v2, relation in cross:
+                if a not in (a1, a2) or a1 not in done or a2 not in done:
+                    continue
+                self.candidates_checked += len(rows)
+                rows = rows[relation[self.perms[rows[:, a1], v1], self.perms[rows[:, a2], v2]]]
+            if not len(rows):
+                return rows
+
+        if wide:
+            valid = [all(constraint.is_valid(self._decode(row)) for constraint in wide) for row in rows]
+            rows = rows[np.array(valid, dtype=bool)]
+        return rows
+
+    def _decode(self, row: 'np.ndarray') -> Dict[int, Dict[str, str]]:
+        grid = {houseNr: {} for houseNr in range(1, self.num_House + 1)}
+        for a, attr_key in enumerate(self.attr_keys):
+            for v, h in enumerate(self.perms[row[a]]):
+                grid[int(h) + 1][attr_key] = self.attr_values[a][v]
+        return grid
+
+    def _ensure_enumerated(self) -> None:
+        if self.solutions is None:
+            self.start_time = time.time()
+            self.solutions = self._enumerate()
+            self.solution_count = len(self.solutions)
+            self.status = 'solved' if self.solution_count else 'unsat'
+
+    def solve(self) -> Optional[Dict[int, Dict[str, str]]]:
+        """First solution of the enumeration, or None."""
+        self._ensure_enumerated()
+        if not self.solution_count:
+            return None
+        self.best_partial = self._decode(self.solutions[0])
+        return self.best_partial
+
+    def iter_solutions(self, limit: Optional[int] = None) -> Iterator[Dict[int, Dict[str, str]]]:
+        """Yield up to `limit` solutions (all of them if None)."""
+        self._ensure_enumerated()
+        for row in self.solutions[:limit]:
+            yield self._decode(row)
+
+    def count_solutions(self, limit: Optional[int] = None) -> int:
+        """Exact number of solutions, capped at `limit` if given."""
+        self._ensure_enumerated()
+        return self.solution_count if limit is None else min(self.solution_count, limit)
+
+    def get_stats(self) -> Dict[str, object]:
+        """Outcome of the last solve; there is no search, so no search nodes."""
+        return {
+            'status': self.status,
+            'best_partial': self.best_partial,
+            'elapsed': time.time() - self.start_time,
+            'backtrack_count': 0,
+            'candidates_checked': self.candidates_checked,
+            'solution_count': self.solution_count,
+        }
@@ -0,0 +1,391 @@
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+from constraints import Constraint, ValueIndex
+from constraint_solver import luby
+
+
+class CDCL:
+    """
+    Conflict-driven clause learning over DIMACS-style literals (variable v > 0 is the
+    literal v, its negation is -v).
+
+    Two watched literals per clause, first-UIP conflict analysis with non-chronological
+    backjumping, VSIDS variable activities with phase saving, and Luby restarts.
+    The literal a clause implies is always kept at position 0, so conflict analysis can
+    walk the reasons without searching them.
+    """
+
+    def __init__(self, num_vars: int, restart_base: int = 100):
+        self.num_vars = num_vars
+        self.clauses = []
+        # watches[2 * v] / watches[2 * v + 1]: clauses watching literal v / -v
+        self.watches = [[] for _ in range(2 * num_vars + 2)]
+        self.values = [0] * (num_vars + 1)  # 1 = true, -1 = false, 0 = unassigned
+        self.levels = [0] * (num_vars + 1)
+        self.reasons = [None] * (num_vars + 1)  # Index of the clause that implied the variable
+        self.trail = []
+        self.trail_lim = []  # Trail length at the start of every decision level
+        self.qhead = 0
+        self.ok = True  # False once the clauses are known to be unsatisfiable
+
+        # VSIDS: activity per variable, a lazy max-heap of (-activity, var), saved phases
+        self.activity = [0.0] * (num_vars + 1)
+        self.var_inc = 1.0
+        self.var_decay = 0.95
+        self.heap = [(0.0, v) for v in range(1, num_vars + 1)]
+        self.phase = [False] * (num_vars + 1)
+        self.restart_base = restart_base
+
+        self.decisions = 0
+        self.conflicts = 0
+        self.propagations = 0
+        self.learned_clauses = 0
+        self.restart_count = 0
+
+    def _value(self, lit: int) -> int:
+        value = self.values[abs(lit)]
+        return value if lit > 0 else -value
+
+    def add_clause(self, literals: List[int]) -> bool:
+        """Add a clause before solving. Returns False once the clause set is unsatisfiable."""
+        if not self.ok:
+            return False
+        clause = []
+        for lit in dict.fromkeys(literals):
+            if -lit in clause or self._value(lit) == 1:
+                return True  # Tautology or already satisfied at the root
+            if self._value(lit) == 0:
+                clause.append(lit)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._enqueue(clause[0], None)
+            self.ok = self._propagate() is None
+        else:
+            self._attach(clause)
+        return self.ok
+
+    def _attach(self, clause: List[int]) -> int:
+        ci = len(self.clauses)
+        self.clauses.append(clause)
+        for lit in clause[:2]:
+            self.watches[2 * abs(lit) + (lit < 0)].append(ci)
+        return ci
+
+    def _enqueue(self, lit: int, reason: Optional[int]) -> None:
+        v = abs(lit)
+        self.values[v] = 1 if lit > 0 else -1
+        self.levels[v] = len(self.trail_lim)
+        self.reasons[v] = reason
+        self.trail.append(lit)
+
+    def _propagate(self) -> Optional[int]:
+        """Unit propagation over the watched literals. Returns a conflicting clause index or None."""
+        values = self.values
+        clauses = self.clauses
+        watches = self.watches
+        trail = self.trail
+
+        while self.qhead < len(trail):
+            false_lit = -trail[self.qhead]
+            self.qhead += 1
+            self.propagations += 1
+
+            slot = 2 * abs(false_lit) + (false_lit < 0)
+            watching = watches[slot]
+            watches[slot] = kept = []
+            for n, ci in enumerate(watching):
+                clause = clauses[ci]
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                first_value = values[first] if first > 0 else -values[-first]
+                if first_value == 1:
+                    kept.append(ci)
+                    continue
+
+                # Look for a replacement watch that is not false
+                for k in range(2, len(clause)):
+                    lit = clause[k]
+                    if (values[lit] if lit > 0 else -values[-lit]) != -1:
+                        clause[1], clause[k] = lit, false_lit
+                        watches[2 * abs(lit) + (lit < 0)].append(ci)
+                        break
+                else:
+                    kept.append(ci)
+                    if first_value == -1:
+                        kept.extend(watching[n + 1:])
+                        self.qhead = len(trail)
+                        return ci
+                    self._enqueue(first, ci)
+        return None
+
+    def _analyze(self, conflict: int) -> Tuple[List[int], int]:
+        """First-UIP learning: the learned clause (asserting literal first) and the level to jump back to."""
+        level = len(self.trail_lim)
+        seen = set()
+        learned = [0]
+        pending = 0  # Literals of the current level still to be resolved away
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        p = None
+
+        while True:
+            for q in (clause if p is None else clause[1:]):
+                v = abs(q)
+                if v in seen or self.levels[v] == 0:
+                    continue
+                seen.add(v)
+                self._bump(v)
+                if self.levels[v] == level:
+                    pending += 1
+                else:
+                    learned.append(q)
+
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            p = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            seen.discard(abs(p))
+            clause = self.clauses[self.reasons[abs(p)]]
+
+        learned[0] = -p
+        if len(learned) == 1:
+            return learned, 0
+        # The second watch must be the literal of the deepest remaining level
+        deepest = max(range(1, len(learned)), key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def _bump(self, v: int) -> None:
+        self.activity[v] += self.var_inc
+        if self.activity[v] > 1e100:
+            # Rescale every activity (and rebuild the heap) before the floats overflow
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.var_inc *= 1e-100
+            self.heap = [(-self.activity[u], u) for u in range(1, self.num_vars + 1) if self.values[u] == 0]
+            heapq.heapify(self.heap)
+        elif self.values[v] == 0:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def _backtrack(self, level: int) -> None:
+        """Undo every assignment above `level`, saving their phases."""
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for lit in self.trail[start:]:
+            v = abs(lit)
+            self.phase[v] = lit > 0
+            self.values[v] = 0
+            self.reasons[v] = None
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def _pick_branch_var(self) -> Optional[int]:
+        """Most active unassigned variable; stale heap entries are skipped."""
+        heap = self.heap
+        while heap:
+            negative_activity, v = heapq.heappop(heap)
+            if self.values[v] == 0 and -negative_activity == self.activity[v]:
+                return v
+        return None
+
+    def solve(self, deadline: Optional[float] = None, decision_limit: Optional[int] = None) -> Optional[bool]:
+        """True if satisfiable (model in self.values), False if not, None if a budget ran out."""
+        if not self.ok:
+            return False
+        if self._propagate() is not None:
+            self.ok = False
+            return False
+
+        run = 1
+        restart_at = self.conflicts + self.restart_base * luby(run)
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learned, level = self._analyze(conflict)
+                self._backtrack(level)
+                if len(learned) == 1:
+                    self._enqueue(learned[0], None)
+                else:
+                    self._enqueue(learned[0], self._attach(learned))
+                    self.learned_clauses += 1
+                self.var_inc /= self.var_decay
+                continue
+
+            if self.conflicts >= restart_at and self.trail_lim:
+                self.restart_count += 1
+                run += 1
+                restart_at = self.conflicts + self.restart_base * luby(run)
+                self._backtrack(0)
+                continue
+
+            if decision_limit is not None and self.decisions >= decision_limit:
+                return None
+            if deadline is not None and time.time() > deadline:
+                return None
+
+            v = self._pick_branch_var()
+            if v is None:
+                return True
+            self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self._enqueue(v if self.phase[v] else -v, None)
+
+
+class SATSolver:
+    """
+    Zebra puzzle engine on top of CDCL: one boolean per (house, attribute, value).
+
+    Every house holds exactly one value per attribute and every value sits in at most one
+    house (exactly one when the attribute has a value per house). Each clue becomes clauses
+    through its own filter_positions routine, so no clue type needs a template of its own:
+    - one value: the houses it is ruled out of become unit clauses
+    - two values: for every house of the first, "not here, or the second is in one of the
+      houses filter_positions leaves it" (support clauses, as strong as arc consistency)
+    - other scopes: every combination of houses is_valid rejects becomes a clause
+    Offers the same solve / status / best_partial / get_stats interface as ConstraintSolver;
+    node_limit counts decisions.
+    """
+
+    def __init__(self, attributes: Dict[str, List[str]], constraints: List[Constraint],
+                 time_limit: Optional[float] = None, node_limit: Optional[int] = None):
+        self.attributes = attributes
+        self.constraints = constraints
+        self.num_House = len(next(iter(attributes.values())))
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.status = None
+        self.best_partial = {}
+
+        self.index = ValueIndex(attributes)
+        self.attr_keys = self.index.attr_keys
+        self.attr_values = self.index.attr_values
+
+        # Variables are numbered attribute by attribute, house by house
+        self.offsets = []
+        num_vars = 0
+        for values in self.attr_values:
+            self.offsets.append(num_vars)
+            num_vars += self.num_House * len(values)
+
+        self.start_time = time.time()
+        self.engine = CDCL(num_vars)
+        self._encode_grid()
+        self._encode_constraints()
+
+    def _var(self, h: int, a: int, v: int) -> int:
+        """Variable of "house h + 1 holds value v of attribute a"."""
+        return self.offsets[a] + h * len(self.attr_values[a]) + v + 1
+
+    def _add_exactly_one(self, literals: List[int], at_least: bool = True) -> None:
+        if at_least:
+            self.engine.add_clause(literals)
+        for i in range(len(literals)):
+            for j in range(i + 1, len(literals)):
+                self.engine.add_clause([-literals[i], -literals[j]])
+
+    def _encode_grid(self) -> None:
+        """All-different rows: one value per cell, one house per value."""
+        for a, values in enumerate(self.attr_values):
+            for h in range(self.num_House):
+                self._add_exactly_one([self._var(h, a, v) for v in range(len(values))])
+            for v in range(len(values)):
+                self._add_exactly_one([self._var(h, a, v) for h in range(self.num_House)],
+                                      at_least=len(values) == self.num_House)
+
+    def _houses_clause(self, a: int, v: int, mask: int) -> List[int]:
+        return [self._var(h, a, v) for h in range(self.num_House) if mask >> h & 1]
+
+    def _encode_constraints(self) -> None:
+        for constraint, interned in self.index.clues(self.constraints):
+            if not interned:
+                self.engine.add_clause([])
+            elif len(interned) == 1:
+                (a, v), = interned
+                allowed = constraint.allowed_positions(self.num_House)
+                for h in range(self.num_House):
+                    if not allowed >> h & 1:
+                        self.engine.add_clause([-self._var(h, a, v)])
+            elif len(interned) == 2:
+                (a1, v1), (a2, v2) = interned
+                for h, supports in enumerate(constraint.relation(self.num_House)):
+                    self.engine.add_clause([-self._var(h, a1, v1)] + self._houses_clause(a2, v2, supports))
+            else:
+                self._encode_forbidden_tuples(constraint, constraint.get_scope(), interned)
+
+    def _encode_forbidden_tuples(self, constraint: Constraint, scope: List[Tuple[str, str]],
+                                 interned: List[Tuple[int, int]]) -> None:
+        """Fallback for wider scopes: one clause per combination of houses is_valid rejects."""
+        houses = [0] * len(scope)
+        while True:
+            placement = {}
+            for (value, attr_key), h in zip(scope, houses):
+                placement.setdefault(h + 1, {})[attr_key] = value
+            if not constraint.is_valid(placement):
+                self.engine.add_clause([-self._var(h, a, v) for (a, v), h in zip(interned, houses)])
+
+            i = 0
+            while i < len(houses) and houses[i] == self.num_House - 1:
+                houses[i] = 0
+                i += 1
+            if i == len(houses):
+                return
+            houses[i] += 1
+
+    def _decode(self, root_only: bool = False) -> Dict[int, Dict[str, str]]:
+        """Read the grid off the assigned variables; root_only keeps what holds in every solution."""
+        engine = self.engine
+        grid = {}
+        for a, attr_key in enumerate(self.attr_keys):
+            for h in range(self.num_House):
+                for v, value in enumerate(self.attr_values[a]):
+                    var = self._var(h, a, v)
+                    if engine.values[var] == 1 and not (root_only and engine.levels[var] > 0):
+                        grid.setdefault(h + 1, {})[attr_key] = value
+        return grid
+
+    def solve(self) -> Optional[Dict[int, Dict[str, str]]]:
+        """Run CDCL; returns the grid as {house: {attr_key: value}} or None."""
+        deadline = self.start_time + self.time_limit if self.time_limit is not None else None
+        satisfiable = self.engine.solve(deadline, self.node_limit)
+
+        if satisfiable:
+            self.status = 'solved'
+            self.best_partial = self._decode()
+            return self.best_partial
+        if satisfiable is None:
+            self.status = 'timeout' if self.node_limit is None or self.engine.decisions < self.node_limit else 'node_limit'
+            # Literals fixed at the root hold in every solution
+            self.best_partial = self._decode(root_only=True)
+        else:
+            self.status = 'unsat'
+        return None
+
+    def get_stats(self) -> Dict[str, object]:
+        """Outcome of the last solve: status, best partial grid and the engine's counters."""
+        engine = self.engine
+        return {
+            'status': self.status,
+            'best_partial': self.best_partial,
+            'elapsed': time.time() - self.start_time,
+            'backtrack_count': engine.decisions,  # Search nodes, as in ConstraintSolver
+            'decisions': engine.decisions,
+            'conflicts': engine.conflicts,
+            'propagations': engine.propagations,
+            'learned_clauses': engine.learned_clauses,
+            'restart_count': engine.restart_count,
+            'num_vars': engine.num_vars,
+            'num_clauses': len(engine.clauses),
+        }
@@ -8,6 +8,10 @@ from constraints import (
     PositionAbsoluteConstrain, PositionAbsoluteNegativeConstrain
 )
 from constraint_solver import ConstraintSolver
+from sat_solver import SATSolver
+from dlx_solver import DLXSolver
+from permutation_solver import PermutationSolver, can_enumerate
+from batch_solver import BatchSolver
 
 
 def constraint_factory(attrs, clues):
@@ -48,17 +52,13 @@ def constraint_factory(attrs, clues):
     return constrains
 
 
-def solve_single_puzzle(puzzle_id, puzzle_text, verbose=False):
+def parse_puzzle(puzzle_id, puzzle_text, verbose=False):
     """
-    Solves a single puzzle given its ID and text.
-
-    Args:
-        puzzle_id: The ID of the puzzle (string).
-        puzzle_text: The natural language text of the puzzle.
-        verbose: Boolean to enable print outputs.
+    Parses a puzzle text into constraints.
 
     Returns:
-        A string formatted as "id | json_solution | steps" or a failure string.
+        (attrs, attrs_lower, constrains): the attributes as parsed, their lowercased
+        copy the solvers work on, and the Constraint objects; None if parsing fails.
     """
 
     ppp = PreProcess()
@@ -93,10 +93,74 @@ def solve_single_puzzle(puzzle_id, puzzle_text, verbose=False):
         print(f"Error creating constraints for {puzzle_id}: {e}")
         return None
 
+    return attrs, attrs_lower, constrains
+
+
+def select_engine(attrs_lower, time_limit=None, node_limit=None, search=None):
+    """
+    The engine engine='auto' stands for: 'perm' for grids up to 4x4 (when NumPy is
+    installed), 'csp' otherwise. 'perm' has no budgets and no search strategy, so a
+    time_limit, node_limit or search always selects 'csp'.
+    """
+    if time_limit is not None or node_limit is not None or search is not None:
+        return 'csp'
+    return 'perm' if can_enumerate(attrs_lower) else 'csp'
+
+
+def solve_single_puzzle(puzzle_id, puzzle_text, verbose=False, time_limit=None, node_limit=None, search=None,
+                        engine='auto'):
+    """
+    Solves a single puzzle given its ID and text.
+
+    Args:
+        puzzle_id: The ID of the puzzle (string).
+        puzzle_text: The natural language text of the puzzle.
+        verbose: Boolean to enable print outputs.
+        time_limit: Optional wall-clock budget for the search, in seconds.
+        node_limit: Optional budget of search nodes. If a budget runs out, the most
+            complete partial assignment found is returned instead of a solution.
+        search: Search strategy of the CSP solver ('dfs', 'lds' or 'ilds'; None = 'dfs').
+        engine: 'csp' for the ConstraintSolver backtracker, 'sat' for the CDCL SAT engine,
+            'dlx' for the Dancing Links exact-cover engine, 'perm' for the NumPy
+            permutation enumeration; 'auto' picks one with select_engine. On puzzles
+            the parsed clues leave with several solutions, 'perm' and 'csp' may return
+            different (equally valid) grids.
+
+    Returns:
+        A string formatted as "id | json_solution | steps" or a failure string.
+    """
+
+    parsed = parse_puzzle(puzzle_id, puzzle_text, verbose)
+    if parsed is None:
+        return None
+    attrs, attrs_lower, constrains = parsed
+
     # 4. Initialize and run the Constraint Solver
-    Cs = ConstraintSolver(attrs_lower, constrains)
+    if engine == 'auto':
+        engine = select_engine(attrs_lower, time_limit, node_limit, search)
+
+    if engine == 'perm':
+        Cs = PermutationSolver(attrs_lower, constrains)
+    elif engine == 'sat':
+        Cs = SATSolver(attrs_lower, constrains, time_limit=time_limit, node_limit=node_limit)
+    elif engine == 'dlx':
+        Cs = DLXSolver(attrs_lower, constrains, time_limit=time_limit, node_limit=node_limit)
+    elif engine == 'csp':
+        Cs = ConstraintSolver(attrs_lower, constrains, time_limit=time_limit, node_limit=node_limit,
+                              search=search or 'dfs')
+    else:
+        raise ValueError(f"Unknown engine: {engine}")
     solution = Cs.solve()
 
+    if verbose:
+        stats = Cs.get_stats()
+        print(f"Puzzle {puzzle_id}: {stats['status']} after {stats['backtrack_count']} nodes "
+              f"({stats['elapsed']:.3f}s)")
+
+    # Out of budget: fall back to the best partial assignment (unknown cells stay empty)
+    if solution is None and Cs.status in ('timeout', 'node_limit', 'discrepancy_limit') and Cs.best_partial:
+        solution = {pos: Cs.best_partial.get(pos, {}) for pos in range(1, Cs.num_House + 1)}
+
     # --- LOGGING / TRACING (DISABLED FOR BATCH PROCESSING) ---
     # Uncomment below to save individual trace files for each puzzle
     # try:
@@ -108,6 +172,67 @@ def solve_single_puzzle(puzzle_id, puzzle_text, verbose=False):
     #     print(f"Warning: Could not save trace for {puzzle_id}: {e}")
     # ---------------------------------------------------------
 
+    return format_result(puzzle_id, attrs, attrs_lower, solution)
+
+
+def solve_puzzle_batch(puzzles, verbose=False, time_limit=None, node_limit=None, engine='auto'):
+    """
+    Solves many puzzles together: puzzles of the same shape share one vectorized
+    propagation pass (BatchSolver) and only the ones it leaves undecided are searched,
+    each by its own ConstraintSolver.
+
+    Args:
+        puzzles: List of (puzzle_id, puzzle_text) pairs.
+        verbose: Boolean to enable print outputs.
+        time_limit: Optional wall-clock budget per searched puzzle, in seconds.
+        node_limit: Optional budget of search nodes per searched puzzle.
+        engine: 'auto' picks the engine per puzzle as solve_single_puzzle does, so both
+            return the same grids; puzzles it gives to 'perm' skip the batch. 'csp'
+            sends every puzzle through the batch.
+
+    Returns:
+        One result per puzzle, in input order, formatted as in solve_single_puzzle
+        (None for a puzzle that could not be parsed).
+    """
+    if engine not in ('auto', 'csp'):
+        raise ValueError(f"Unknown engine: {engine}")
+    results = [None] * len(puzzles)
+    parsed = []
+    for i, (puzzle_id, puzzle_text) in enumerate(puzzles):
+        parsed_puzzle = parse_puzzle(puzzle_id, puzzle_text, verbose)
+        if parsed_puzzle is None:
+            continue
+        attrs, attrs_lower, constrains = parsed_puzzle
+        if engine == 'auto' and select_engine(attrs_lower, time_limit, node_limit) == 'perm':
+            solution = PermutationSolver(attrs_lower, constrains).solve()
+            results[i] = format_result(puzzle_id, attrs, attrs_lower, solution)
+            continue
+        parsed.append((i, puzzle_id, parsed_puzzle))
+
+    batch = BatchSolver([(attrs_lower, constrains) for _, _, (_, attrs_lower, constrains) in parsed],
+                        time_limit=time_limit, node_limit=node_limit)
+    solutions = batch.solve_all()
+
+    for (i, puzzle_id, (attrs, attrs_lower, _)), solution, Cs in zip(parsed, solutions, batch.solvers):
+        # Out of budget: fall back to the best partial assignment, as in solve_single_puzzle
+        if (solution is None and Cs is not None and Cs.best_partial
+                and Cs.status in ('timeout', 'node_limit', 'discrepancy_limit')):
+            solution = {pos: Cs.best_partial.get(pos, {}) for pos in range(1, Cs.num_House + 1)}
+        results[i] = format_result(puzzle_id, attrs, attrs_lower, solution)
+
+    if verbose:
+        stats = batch.get_stats()
+        print(f"Batch of {stats['puzzles']} puzzles in {stats['groups']} shape groups: "
+              f"{stats['propagated_solved']} solved and {stats['propagated_unsat']} refuted by propagation, "
+              f"{stats['searched']} searched ({stats['elapsed']:.3f}s)")
+    return results
+
+
+def format_result(puzzle_id, attrs, attrs_lower, solution):
+    """
+    Formats a solution as "id | json_solution | steps", restoring the original casing.
+    """
+
     # 5. Output Formatting
     if solution:
         # Create mapping to restore original casing (e.g., 'peter' -> 'Peter')
@@ -148,4 +273,4 @@ def solve_single_puzzle(puzzle_id, puzzle_text, verbose=False):
         return f"{puzzle_id} | {json.dumps(grid_solution)} | {steps}"
 
     # Return failure string if no solution found
-    return f"{puzzle_id} | | 11"
\ No newline at end of file
+    return f"{puzzle_id} | | 11"
@@ -0,0 +1,135 @@
+from typing import Dict, List, Tuple
+from constraints import Constraint, ValueIndex
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it tensor propagation is unavailable
+    np = None
+
+
+class TensorPropagator:
+    """
+    Constraint propagation on boolean domain tensors: domains[p, h, a, v] is True while
+    value v of attribute a is still possible in house h of puzzle p. The leading puzzle
+    axis lets one sweep serve a whole batch of same-shape puzzles (one puzzle is p = 0).
+
+    One sweep is a handful of array operations:
+    - all-different: singleton cells remove their value from the rest of the row, a value
+      left with a single house fixes that cell (axis sums over houses and values)
+    - clues: every binary clue is an H x H relation table taken from its filter_positions;
+      the houses of one value that have a supporting house of the other are a boolean
+      matrix product, applied to all clues of all puzzles at once
+    Sweeps repeat until nothing changes. Unary clues are folded into self.initial; clues
+    with wider scopes are left to the search.
+    """
+
+    def __init__(self, puzzles: List[Tuple[Dict[str, List[str]], List[Constraint]]]):
+        if np is None:
+            raise ImportError("TensorPropagator needs NumPy")
+        first_attributes = puzzles[0][0]
+        self.num_puzzles = len(puzzles)
+        self.num_House = len(next(iter(first_attributes.values())))
+        self.num_attrs = len(first_attributes)
+        self.num_values = max(len(dict.fromkeys(values))
+                              for attributes, _ in puzzles for values in attributes.values())
+
+        shape = (self.num_puzzles, self.num_House, self.num_attrs, self.num_values)
+        self.initial = np.zeros(shape, dtype=bool)
+        # Values that must be placed somewhere: attributes with one value per house
+        self.must_place = np.zeros((self.num_puzzles, 1, self.num_attrs, self.num_values), dtype=bool)
+        clues = []
+        for p, (attributes, constraints) in enumerate(puzzles):
+            if len(attributes) != self.num_attrs or len(next(iter(attributes.values()))) != self.num_House:
+                raise ValueError("TensorPropagator needs puzzles of the same shape")
+            index = ValueIndex(attributes)
+            for a, values in enumerate(index.attr_values):
+                self.initial[p, :, a, :len(values)] = True
+                if len(values) == self.num_House:
+                    self.must_place[p, 0, a, :len(values)] = True
+            clues.extend(self._encode(p, constraints, index))
+
+        self.owner = np.array([clue[0] for clue in clues], dtype=np.intp)
+        self.attr1 = np.array([clue[1] for clue in clues], dtype=np.intp)
+        self.value1 = np.array([clue[2] for clue in clues], dtype=np.intp)
+        self.attr2 = np.array([clue[3] for clue in clues], dtype=np.intp)
+        self.value2 = np.array([clue[4] for clue in clues], dtype=np.intp)
+        self.relations = np.array([clue[5] for clue in clues], dtype=bool).reshape(-1, self.num_House, self.num_House)
+        self.relations_reversed = self.relations.transpose(0, 2, 1).copy()
+
+    def _relation(self, constraint: Constraint) -> List[List[bool]]:
+        """relation[h1][h2]: the clue holds with its first value in house h1 and its second in h2."""
+        return [[bool(supports >> h2 & 1) for h2 in range(self.num_House)]
+                for supports in constraint.relation(self.num_House)]
+
+    def _encode(self, p: int, constraints: List[Constraint], index: ValueIndex) -> List[tuple]:
+        """Fold puzzle p's unary clues into self.initial and return its binary clues."""
+        clues = []
+        for constraint, interned in index.clues(constraints):
+            if not interned:
+                self.initial[p] = False
+            elif len(interned) == 1:
+                (a, v), = interned
+                allowed = constraint.allowed_positions(self.num_House)
+                for h in range(self.num_House):
+                    if not allowed >> h & 1:
+                        self.initial[p, h, a, v] = False
+            elif len(interned) == 2:
+                (a1, v1), (a2, v2) = interned
+                relation = self._relation(constraint)
+                if (a1, v1) == (a2, v2):
+                    # Both sides are the same value: only houses compatible with themselves remain
+                    for h in range(self.num_House):
+                        if not relation[h][h]:
+                            self.initial[p, h, a1, v1] = False
+                    continue
+                clues.append((p, a1, v1, a2, v2, relation))
+        return clues
+
+    def from_masks(self, masks: List[List[List[int]]]) -> 'np.ndarray':
+        """Domain tensor from bitmask domains masks[p][h][a] (bit v set = value v possible)."""
+        ints = np.array(masks, dtype=np.int64).reshape(self.num_puzzles, self.num_House, self.num_attrs)
+        return ((ints[..., None] >> np.arange(self.num_values)) & 1).astype(bool)
+
+    def to_masks(self, domains: 'np.ndarray') -> List[List[List[int]]]:
+        """Inverse of from_masks."""
+        return (domains.astype(np.int64) << np.arange(self.num_values)).sum(axis=3).tolist()
+
+    def alive(self, domains: 'np.ndarray') -> 'np.ndarray':
+        """Per puzzle: no empty cell and no value that must be placed but has no house left."""
+        empty_cell = ~domains.any(axis=3)
+        homeless = self.must_place[:, 0] & ~domains.any(axis=1)
+        return ~(empty_cell.any(axis=(1, 2)) | homeless.any(axis=(1, 2)))
+
+    def propagate(self, domains: 'np.ndarray') -> 'np.ndarray':
+        """Narrow the domains in place to the fixpoint and return which puzzles are still consistent."""
+        count = domains.sum()
+        while True:
+            self._all_different(domains)
+            self._clues(domains)
+            new_count = domains.sum()
+            if new_count == count:
+                break
+            count = new_count
+        return self.alive(domains)
+
+    def _all_different(self, domains: 'np.ndarray') -> None:
+        # Singleton cells take their value out of the rest of the row; two of them clash
+        fixed = domains & (domains.sum(axis=3, keepdims=True) == 1)
+        placed = fixed.sum(axis=1, keepdims=True)
+        domains &= (fixed & (placed == 1)) | (placed == 0)
+        # A value with a single house left fixes that cell; two such values in a cell clash
+        sole = domains & (domains.sum(axis=1, keepdims=True) == 1) & self.must_place
+        forced = sole.sum(axis=3, keepdims=True)
+        domains &= (forced == 0) | (sole & (forced == 1))
+
+    def _clues(self, domains: 'np.ndarray') -> None:
+        if not len(self.owner):
+            return
+        owner, houses = self.owner, slice(None)
+        # Houses of the second value that some house of the first value supports, and back
+        first = domains[owner, houses, self.attr1, self.value1]
+        supported = (first[:, None, :] @ self.relations)[:, 0]
+        np.logical_and.at(domains, (owner, houses, self.attr2, self.value2), supported)
+        second = domains[owner, houses, self.attr2, self.value2]
+        supported = (second[:, None, :] @ self.relations_reversed)[:, 0]
+        np.logical_and.at(domains, (owner, houses, self.attr1, self.value1), supported)
@@ -0,0 +1,62 @@
+from solver import constraint_factory
+from constraint_solver import ConstraintSolver
+
+
+def test_count_solutions_ignores_symmetry_breaking():
+    """Bob and Carol are never mentioned, but swapping them gives a different solution."""
+    attrs = {'name': ['alice', 'bob', 'carol'], 'color': ['red', 'green', 'blue']}
+    constraints = constraint_factory(attrs, [
+        "alice is the person who loves red.",
+        "alice is in the first house.",
+        "the person who loves green is directly left of the person who loves blue.",
+    ])
+
+    assert ConstraintSolver(attrs, constraints).count_solutions(limit=None) == 2
+    assert ConstraintSolver(attrs, constraints, symmetry_breaking=False).count_solutions(limit=None) == 2
+    assert len(list(ConstraintSolver(attrs, constraints).iter_solutions())) == 2
+    assert ConstraintSolver(attrs, constraints).solve() is not None
+
+
+def test_count_solutions_reports_unmentioned_attribute():
+    """Nothing places the pets, so the uniqueness check must not call the puzzle unique."""
+    attrs = {'name': ['alice', 'bob'], 'pet': ['cat', 'dog']}
+    constraints = constraint_factory(attrs, ["alice is in the first house."])
+
+    assert ConstraintSolver(attrs, constraints).count_solutions() == 2
+    assert ConstraintSolver(attrs, constraints, decompose=False).count_solutions() == 2
+
+
+def test_count_solutions_after_solve():
+    """solve() leaves the search at its first solution; counting afterwards must start over."""
+    attrs = {'name': ['alice', 'bob', 'carol'], 'color': ['red', 'green', 'blue']}
+    constraints = constraint_factory(attrs, ["alice is in the first house."])
+
+    solver = ConstraintSolver(attrs, constraints, decompose=False)
+    assert solver.solve() is not None
+    assert solver.count_solutions(limit=None) == 12
+    assert solver.count_solutions(limit=None) == 12
+    assert ConstraintSolver(attrs, constraints, decompose=False).count_solutions(limit=None) == 12
+
+    solver = ConstraintSolver(attrs, constraints, decompose=False, symmetry_breaking=False)
+    assert solver.solve() is not None
+    assert len(list(solver.iter_solutions())) == 12
+
+
+def test_uneven_attribute_lists_are_not_decomposed():
+    """Without clues each attribute is its own component, but the house count must stay shared."""
+    for attrs in ({'a': ['x', 'y', 'z'], 'b': ['p', 'q', 'r', 's']}, {'a': ['x', 'y', 'z'], 'b': ['p', 'q']}):
+        solver = ConstraintSolver(attrs, [])
+        assert solver.solve() == ConstraintSolver(attrs, [], decompose=False).solve()
+        assert solver.status == 'unsat'
+
+
+def test_decomposed_trace_uses_the_full_layout():
+    """Sub-solver trace rows get one feature column per house and attribute of the whole puzzle."""
+    attrs = {'name': ['alice', 'bob'], 'pet': ['cat', 'dog']}
+    constraints = constraint_factory(attrs, ["alice is in the first house."])
+
+    solver = ConstraintSolver(attrs, constraints)
+    solver.solve()
+    assert len(solver.components) == 2 and solver.search_trace
+    assert [row[0] for row in solver.search_trace] == list(range(1, len(solver.search_trace) + 1))
+    assert all(len(row) == 4 + 2 * 2 for row in solver.search_trace)
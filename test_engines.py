@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from solver import constraint_factory
+from constraint_solver import ConstraintSolver
+from sat_solver import SATSolver
+from dlx_solver import DLXSolver
+from batch_solver import BatchSolver
+import tensor_propagation
+
+pytest.importorskip('numpy')
+from permutation_solver import PermutationSolver
+
+VALUES = {
+    'name': ['alice', 'bob', 'carol', 'dave'],
+    'color': ['red', 'green', 'blue', 'white'],
+    'pet': ['cat', 'dog', 'fish', 'bird'],
+    'drink': ['tea', 'milk', 'juice', 'water'],
+}
+ORDINALS = ['first', 'second', 'third', 'fourth']
+CSP_OPTIONS = [dict(), dict(nogood_limit=50), dict(branching='value'), dict(propagation='tensor')]
+
+
+def describe(value, attr_key):
+    if attr_key == 'name':
+        return value
+    if attr_key == 'color':
+        return f"the person who loves {value}"
+    return f"the {value} {'owner' if attr_key == 'pet' else 'drinker'}"
+
+
+def random_puzzle(num_House, num_clues, seed, lie=0.0):
+    """Clue texts about a hidden grid; with `lie`, that share of clues is about random houses instead."""
+    rnd = random.Random(seed)
+    attrs = {attr_key: values[:num_House] for attr_key, values in list(VALUES.items())[:num_House]}
+    house_of = {}
+    for attr_key, values in attrs.items():
+        for h, value in enumerate(rnd.sample(values, num_House)):
+            house_of[(value, attr_key)] = h
+    items = sorted(house_of)
+
+    clues = []
+    while len(clues) < num_clues:
+        first, second = rnd.sample(items, 2)
+        h1, h2 = house_of[first], house_of[second]
+        if rnd.random() < lie:
+            h1, h2 = rnd.randrange(num_House), rnd.randrange(num_House)
+        a, b = describe(*first), describe(*second)
+        kind = rnd.randrange(8)
+        if kind == 0 and h1 == h2:
+            clues.append(f"{a} is {b}.")
+        elif kind == 1 and h2 - h1 == 1:
+            clues.append(f"{a} is directly left of {b}.")
+        elif kind == 2 and h1 < h2:
+            clues.append(f"{a} is somewhere to the left of {b}.")
+        elif kind == 3 and h1 > h2:
+            clues.append(f"{a} is somewhere to the right of {b}.")
+        elif kind == 4 and abs(h1 - h2) == 1:
+            clues.append(f"{a} and {b} are next to each other.")
+        elif kind == 5 and abs(h1 - h2) == 2:
+            clues.append(f"there is one house between {a} and {b}.")
+        elif kind == 6:
+            clues.append(f"{a} is in the {ORDINALS[h1]} house.")
+        elif kind == 7:
+            clues.append(f"{a} is not in the {ORDINALS[(h1 + 1) % num_House]} house.")
+    return attrs, constraint_factory(attrs, clues)
+
+
+def grid_key(grid):
+    return tuple(sorted((houseNr, attr_key, value) for houseNr, values in grid.items()
+                        for attr_key, value in values.items()))
+
+
+@pytest.mark.parametrize('num_House, seed', [(n, seed) for n in (3, 4) for seed in range(25)])
+def test_engines_agree_with_enumeration(num_House, seed):
+    """Every engine must find a solution exactly when PermutationSolver does, and only real ones."""
+    attrs, constraints = random_puzzle(num_House, 2 * num_House + seed % (2 * num_House), seed,
+                                       lie=0.2 if seed % 3 == 0 else 0.0)
+    reference = {grid_key(grid) for grid in PermutationSolver(attrs, constraints).iter_solutions()}
+
+    for options in CSP_OPTIONS:
+        assert ConstraintSolver(attrs, constraints, **options).count_solutions(limit=None) == len(reference), options
+        solution = ConstraintSolver(attrs, constraints, **options).solve()
+        assert (solution is None) == (not reference), options
+        assert solution is None or grid_key(solution) in reference, options
+
+    for engine in (SATSolver, DLXSolver):
+        solution = engine(attrs, constraints).solve()
+        assert (solution is None) == (not reference), engine.__name__
+        assert solution is None or grid_key(solution) in reference, engine.__name__
+
+
+def test_batch_solver_without_numpy(monkeypatch):
+    """Without NumPy every puzzle is searched on its own, with the same answers."""
+    puzzles = [random_puzzle(3, 4 + seed % 4, seed) for seed in range(6)]
+    references = [{grid_key(grid) for grid in PermutationSolver(attrs, constraints).iter_solutions()}
+                  for attrs, constraints in puzzles]
+    monkeypatch.setattr(tensor_propagation, 'np', None)
+
+    batch = BatchSolver(puzzles)
+    for solution, reference in zip(batch.solve_all(), references):
+        assert (solution is None) == (not reference)
+        assert solution is None or grid_key(solution) in reference
+    assert batch.get_stats()['searched'] == len(puzzles) and batch.get_stats()['groups'] == 0